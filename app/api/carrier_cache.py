@@ -0,0 +1,185 @@
+import asyncio
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, errors
+from app.cache import TTLCache
+from app.singleflight import SingleFlight
+from app.config import (
+    CARRIER_CACHE_SIZE,
+    CARRIER_CACHE_TTL,
+    CARRIER_CACHE_NEGATIVE_TTL,
+    CARRIER_CACHE_MAX_STALE,
+    CENSUS_DB_PATH,
+    CENSUS_MAX_AGE_DAYS,
+    logger
+)
+from app.api.carrier_summary import CarrierSummary
+from app.db.census import CensusIndex
+from app.db.mongo import db, run_db
+from app import metrics
+
+CARRIER_CACHE_COLLECTION = 'carrier_cache'
+
+# Verification results by 'MC:123456' / 'DOT:654321'; kept until they are too stale to serve
+_memory = TTLCache(maxsize=CARRIER_CACHE_SIZE, ttl=CARRIER_CACHE_MAX_STALE)
+metrics.register_cache('carrier_profiles', _memory)
+
+# Keys with a background refresh running, and the tasks themselves so they aren't garbage collected
+_refreshing = set()
+_refresh_tasks = set()
+
+# Concurrent misses for the same carrier share one FMCSA request
+_flights = SingleFlight('carrier_lookups')
+_reads = SingleFlight('carrier_cache_reads')
+
+
+# Local census snapshot consulted before any cache tier or the live API
+census_index = CensusIndex(CENSUS_DB_PATH, CENSUS_MAX_AGE_DAYS * 24 * 3600) if CENSUS_DB_PATH else None
+
+
+def cache_key(number_type, number):
+    return f"{number_type.upper()}:{str(number).strip().lstrip('0') or '0'}"
+
+
+def _fresh_for(result):
+    """Seconds a result stays fresh: found carriers live longer than misses."""
+    return CARRIER_CACHE_TTL if result['status'] == 'verified' else CARRIER_CACHE_NEGATIVE_TTL
+
+
+def _keys_for(number_type, number, result):
+    """Cache a verified carrier under its DOT number too, so either lookup hits."""
+    keys = {cache_key(number_type, number)}
+    if result['status'] == 'verified' and result['data'].dot_number:
+        keys.add(cache_key('DOT', result['data'].dot_number))
+    return keys
+
+
+def ensure_carrier_cache_indexes():
+    """Expire Mongo entries once they are too stale to serve."""
+    db[CARRIER_CACHE_COLLECTION].create_index([('expiresAt', ASCENDING)], expireAfterSeconds=0)
+
+
+def _to_document(result):
+    if result.get('data') is None:
+        return result
+    return dict(result, data=result['data'].to_dict())
+
+
+def _from_document(result):
+    data = result.get('data')
+    if data is None:
+        return result
+    return dict(result, data=CarrierSummary.from_stored(data))
+
+
+def _load_entry(key):
+    doc = db[CARRIER_CACHE_COLLECTION].find_one({'_id': key}, {'result': 1, 'fetchedAt': 1})
+    if not doc:
+        return None
+    fetched_at = doc['fetchedAt'].replace(tzinfo=timezone.utc).timestamp()
+    return {'result': _from_document(doc['result']), 'fetchedAt': fetched_at}
+
+
+def _store_entries(keys, entry):
+    fetched_at = datetime.fromtimestamp(entry['fetchedAt'], tz=timezone.utc)
+    result = _to_document(entry['result'])
+    for key in keys:
+        db[CARRIER_CACHE_COLLECTION].replace_one(
+            {'_id': key},
+            {
+                'result': result,
+                'fetchedAt': fetched_at,
+                'expiresAt': fetched_at + timedelta(seconds=CARRIER_CACHE_MAX_STALE)
+            },
+            upsert=True
+        )
+
+
+async def _get_entry(key):
+    """Read an entry from memory, then MongoDB, promoting Mongo hits into memory."""
+    entry = _memory.get(key)
+    if entry is not None:
+        metrics.increment('carrier_cache.hit.memory')
+        return entry
+    return await _reads.do(key, lambda: _read_through(key))
+
+
+async def _read_through(key):
+    try:
+        entry = await run_db(_load_entry, key)
+    except errors.PyMongoError as e:
+        logger.warning(f"Carrier cache read failed for {key}: {e}")
+        return None
+    if entry is not None:
+        metrics.increment('carrier_cache.hit.mongo')
+        _memory.set(key, entry, ttl=max(entry['fetchedAt'] + CARRIER_CACHE_MAX_STALE - time.time(), 0))
+    return entry
+
+
+async def _fetch_and_store(number_type, number, fetch):
+    result = await fetch()
+    if result['status'] in ('verified', 'not_verified'):  # Errors are transient and never cached
+        entry = {'result': result, 'fetchedAt': time.time()}
+        keys = _keys_for(number_type, number, result)
+        for key in keys:
+            _memory.set(key, entry)
+        try:
+            await run_db(_store_entries, keys, entry)
+        except errors.PyMongoError as e:
+            logger.warning(f"Carrier cache write failed for {keys}: {e}")
+    return result
+
+
+async def put_carrier(number_type, number, result):
+    """Store a result fetched outside get_carrier (e.g. by a watchlist re-check) in both cache tiers."""
+    async def fetched():
+        return result
+    await _fetch_and_store(number_type, number, fetched)
+
+
+async def _refresh(key, number_type, number, fetch):
+    try:
+        await _flights.do(key, lambda: _fetch_and_store(number_type, number, fetch))
+        metrics.increment('carrier_cache.refresh.ok')
+    except Exception as e:
+        metrics.increment('carrier_cache.refresh.failed')
+        logger.error(f"Background refresh of {key} failed: {e}")
+    finally:
+        _refreshing.discard(key)
+
+
+async def get_carrier(number_type, number, fetch):
+    """Return a carrier verification result, serving from cache where possible.
+
+    `fetch` is an async callable doing the live FMCSA lookup. Fresh entries
+    are returned as-is. Stale entries (up to CARRIER_CACHE_MAX_STALE old) are
+    returned immediately while a background task refreshes them. Misses wait
+    for the live lookup. Active carriers in a fresh census snapshot are
+    answered locally before any of that.
+    """
+    if census_index is not None:
+        try:
+            result = census_index.lookup(number_type, number)
+        except sqlite3.Error as e:
+            logger.warning(f"Census index lookup failed: {e}")
+            result = None
+        if result is not None:
+            metrics.increment('carrier_cache.hit.census')
+            return result
+
+    key = cache_key(number_type, number)
+    entry = await _get_entry(key)
+    if entry is None:
+        metrics.increment('carrier_cache.miss')
+        return await _flights.do(key, lambda: _fetch_and_store(number_type, number, fetch))
+
+    age = time.time() - entry['fetchedAt']
+    metrics.observe('carrier_cache.age_seconds', age)
+    if age > _fresh_for(entry['result']) and key not in _refreshing:
+        metrics.increment('carrier_cache.stale_served')
+        _refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(_refresh(key, number_type, number, fetch))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+    return entry['result']
@@ -0,0 +1,87 @@
+import weakref
+from dataclasses import dataclass, asdict, fields
+from typing import Optional
+
+# One shared summary per DOT number while anything (user_data, a cache entry) still references it
+_interned = weakref.WeakValueDictionary()
+
+
+class _WeakReferenceable:
+    # dataclass(weakref_slot=True) needs Python 3.11; a slotted base gives the same __weakref__ slot on 3.10
+    __slots__ = ('__weakref__',)
+
+
+@dataclass(frozen=True, slots=True)
+class CarrierSummary(_WeakReferenceable):
+    """The carrier fields the bot renders, parsed once from an FMCSA or census record."""
+    legal_name: Optional[str] = None
+    dba_name: Optional[str] = None
+    dot_number: Optional[str] = None
+    mc_number: Optional[str] = None
+    allowed_to_operate: Optional[str] = None
+    safety_rating: Optional[str] = None
+    operation_type: Optional[str] = None
+    drivers: Optional[int] = None
+    inspections: Optional[int] = None
+    address: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.legal_name or self.dba_name or 'Unknown Company'
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CarrierSummary':
+        """Rebuild a summary stored with to_dict(), ignoring unknown keys."""
+        names = {field.name for field in fields(cls)}
+        return intern_summary(cls(**{key: value for key, value in data.items() if key in names}))
+
+    @classmethod
+    def from_stored(cls, data: dict, mc_number=None) -> 'CarrierSummary':
+        """Rebuild a stored summary, including documents written before summaries existed.
+
+        Those hold the raw FMCSA `{'carrier': {...}}` content, which from_dict would reduce to an empty summary.
+        """
+        if 'carrier' in data:
+            return cls.from_fmcsa(data, mc_number)
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_fmcsa(cls, content: dict, mc_number=None) -> 'CarrierSummary':
+        """Summarize the `content` of an FMCSA carrier response (a DOT lookup, or one item of a docket lookup)."""
+        carrier = content.get('carrier') or {}
+        inspections = None
+        if carrier.get('driverInsp') is not None or carrier.get('vehicleInsp') is not None:
+            inspections = (carrier.get('driverInsp') or 0) + (carrier.get('vehicleInsp') or 0)
+        street_parts = [carrier.get('phyStreet'), carrier.get('phyCity'), carrier.get('phyState'), carrier.get('phyZipcode')]
+        address = ', '.join(str(part).strip() for part in street_parts if part) or None
+        operation = carrier.get('carrierOperation') or {}
+        return intern_summary(cls(
+            legal_name=carrier.get('legalName'),
+            dba_name=carrier.get('dbaName'),
+            dot_number=_as_str(carrier.get('dotNumber')),
+            mc_number=_as_str(mc_number),
+            allowed_to_operate=carrier.get('allowedToOperate'),
+            safety_rating=carrier.get('safetyRating'),
+            operation_type=operation.get('carrierOperationDesc') if isinstance(operation, dict) else operation,
+            drivers=carrier.get('totalDrivers'),
+            inspections=inspections,
+            address=address
+        ))
+
+
+def _as_str(value):
+    return None if value is None else str(value).strip().lstrip('0') or '0'
+
+
+def intern_summary(summary: CarrierSummary) -> CarrierSummary:
+    """Return the shared instance equal to summary, keyed by DOT number, so repeated lookups don't duplicate it."""
+    if summary.dot_number is None:
+        return summary
+    existing = _interned.get(summary.dot_number)
+    if existing == summary:
+        return existing
+    _interned[summary.dot_number] = summary
+    return summary
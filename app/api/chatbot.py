@@ -1,20 +1,224 @@
+import asyncio
+import json
+from contextlib import aclosing
 import openai
-from app.config import OPENAI_API_KEY, logger
+from openai import AsyncOpenAI
+from app.config import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_DEADLINE_SECONDS,
+    OPENAI_RETRY_ATTEMPTS,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    CONVERSATION_REPLY_TOKENS,
+    CONVERSATION_SUMMARY_TOKENS,
+    logger
+)
+from app.api.http import get_http_client
+from app.cache import TTLCache
+from app import metrics
+from app.singleflight import SingleFlight
+from app.api import resilience
 
-# Set the OpenAI API key
-openai.api_key = OPENAI_API_KEY
+FALLBACK_REPLY = "Sorry, I'm having trouble processing your request right now. Please try again later."
+
+COMPLETION_PARAMS = {'max_tokens': 150, 'n': 1, 'temperature': 0.5}
+
+# Finished replies keyed on model, normalized prompt and completion parameters
+_responses = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+metrics.register_cache('llm_responses', _responses)
+
+# The same prompt asked by several users at once is only sent to OpenAI once
+_flights = SingleFlight('openai')
+
+# Bounds how many completions are in flight at once across all chats
+_openai_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+_breaker = resilience.get_breaker(
+    'openai',
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_SECONDS
+)
+# Connection problems, timeouts, rate limiting and 5xx responses are worth another try; bad requests are not
+_retry = resilience.RetryPolicy(
+    attempts=OPENAI_RETRY_ATTEMPTS,
+    base_delay=RETRY_BASE_DELAY,
+    max_delay=RETRY_MAX_DELAY,
+    retry_on=(openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+)
+
+_client = None
+_client_pool = None
+
+def get_openai_client() -> AsyncOpenAI:
+    """Return the async OpenAI client, built on the process-wide HTTP connection pool."""
+    global _client, _client_pool
+    http_client = get_http_client()
+    if _client is None or _client_pool is not http_client:  # The pool is recreated after close_http_client()
+        # Retries are left to the resilience layer so they share its deadline and circuit breaker
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client, timeout=OPENAI_TIMEOUT, max_retries=0)
+        _client_pool = http_client
+    return _client
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt, so trivially different messages share a cache entry."""
+    return ' '.join(prompt.split()).casefold()
+
+def response_cache_key(prompt: str):
+    return (OPENAI_MODEL, normalize_prompt(prompt), tuple(sorted(COMPLETION_PARAMS.items())))
 
 async def get_chatbot_response(prompt):
-    """Get a response from the GPT model based on the provided prompt."""
+    """Get a response from the GPT model based on the provided prompt.
+
+    Replies are cached for LLM_CACHE_TTL seconds, and concurrent identical
+    prompts share one completion. Failures return FALLBACK_REPLY and are not
+    cached.
+    """
+    key = response_cache_key(prompt)
+    cached = _responses.get(key)
+    if cached is not None:
+        return cached
+    try:
+        reply = await _flights.do(key, lambda: _complete(prompt))
+    except resilience.CircuitOpenError as e:
+        logger.warning(f"Skipped OpenAI API call: {e}")
+        return FALLBACK_REPLY
+    except Exception as e:
+        logger.error(f"Error during OpenAI API call: {e!r}")
+        return FALLBACK_REPLY
+    if not reply:
+        logger.warning("OpenAI returned an empty reply")
+        return FALLBACK_REPLY
+    _responses.set(key, reply)
+    return reply
+
+async def get_function_arguments(prompt, function: dict):
+    """Have the model answer prompt by calling function (a JSON-schema tool definition) and return its arguments.
+
+    Cached and single-flighted like get_chatbot_response. Returns None when the
+    request fails or the model doesn't produce valid JSON arguments.
+    """
+    key = ('function', OPENAI_MODEL, normalize_prompt(prompt), json.dumps(function, sort_keys=True))
+    cached = _responses.get(key)
+    if cached is not None:
+        return cached
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            n=1,
-            temperature=0.5,
+        arguments = await _flights.do(key, lambda: _call_function(prompt, function))
+    except resilience.CircuitOpenError as e:
+        logger.warning(f"Skipped OpenAI API call: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error during OpenAI function call: {e!r}")
+        return None
+    _responses.set(key, arguments)
+    return arguments
+
+async def _call_function(prompt, function):
+    response = await resilience.call(
+        lambda: _create_completion(
+            _user_message(prompt),
+            tools=[{"type": "function", "function": function}],
+            tool_choice={"type": "function", "function": {"name": function['name']}},
+            temperature=0
+        ),
+        _breaker, OPENAI_DEADLINE_SECONDS, retry=_retry
+    )
+    tool_calls = response.choices[0].message.tool_calls
+    if not tool_calls:
+        raise ValueError(f"The model did not call {function['name']}")
+    arguments = json.loads(tool_calls[0].function.arguments)
+    if not isinstance(arguments, dict):
+        raise ValueError(f"{function['name']} arguments are not an object")
+    return arguments
+
+def _request_completion(messages, stream=False, **params):
+    return get_openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=messages,
+        stream=stream,
+        **{**COMPLETION_PARAMS, **params}
+    )
+
+def _user_message(prompt):
+    return [{"role": "user", "content": prompt}]
+
+async def _create_completion(messages, **params):
+    async with _openai_slots:
+        return await _request_completion(messages, **params)
+
+async def _stream_completion(messages, **params):
+    async with _openai_slots:
+        stream = await resilience.call(
+            lambda: _request_completion(messages, stream=True, **params), _breaker, OPENAI_DEADLINE_SECONDS, retry=_retry
         )
-        return response.choices[0].message['content'].strip()
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+async def stream_chatbot_response(prompt):
+    """Yield the GPT reply to prompt in pieces as it is generated.
+
+    A cached reply is yielded whole, and a completed stream is cached for
+    get_chatbot_response and later streams. Opening the stream goes through
+    the breaker, retries and deadline like get_chatbot_response; errors are
+    raised to the caller, which may already have shown part of the reply.
+    """
+    key = response_cache_key(prompt)
+    cached = _responses.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    async with aclosing(_stream_completion(_user_message(prompt))) as stream:
+        async for piece in stream:
+            pieces.append(piece)
+            yield piece
+    reply = ''.join(pieces).strip()
+    if reply:  # An empty stream is shown as the fallback, which is never cached
+        _responses.set(key, reply)
+
+async def _complete(prompt):
+    return await _complete_messages(_user_message(prompt))
+
+async def _complete_messages(messages, **params):
+    response = await resilience.call(
+        lambda: _create_completion(messages, **params), _breaker, OPENAI_DEADLINE_SECONDS, retry=_retry
+    )
+    return response.choices[0].message.content.strip()
+
+def stream_conversation(messages):
+    """Stream the reply to a multi-turn conversation (see app.api.context_window). Not cached: the history makes each request unique."""
+    return _stream_completion(messages, max_tokens=CONVERSATION_REPLY_TOKENS)
+
+async def get_conversation_response(messages):
+    """Reply to a multi-turn conversation in one piece, or FALLBACK_REPLY if the request fails."""
+    try:
+        return await _complete_messages(messages, max_tokens=CONVERSATION_REPLY_TOKENS)
     except Exception as e:
-        logger.error(f"Error during OpenAI API call: {e}")
-        return "Sorry, I'm having trouble processing your request right now. Please try again later."
+        logger.error(f"Error during OpenAI API call: {e!r}")
+        return FALLBACK_REPLY
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this conversation between a user and a freight logistics assistant in a few sentences. "
+    "Keep every load detail (cities, distances, weights, equipment, rates, MC/DOT numbers) and any open questions."
+)
+
+def _transcript(messages):
+    return '\n'.join(f"{message['role'].capitalize()}: {message['content']}" for message in messages)
+
+async def summarize_conversation(summary, messages):
+    """Fold messages into the running conversation summary. Errors are raised so the turns are kept for a retry."""
+    prompt = f"Summary so far: {summary}\n\n" if summary else ''
+    prompt += f"Conversation:\n{_transcript(messages)}"
+    return await _complete_messages(
+        [{"role": "system", "content": SUMMARY_INSTRUCTIONS}, {"role": "user", "content": prompt}],
+        max_tokens=CONVERSATION_SUMMARY_TOKENS
+    )
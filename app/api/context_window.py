@@ -0,0 +1,168 @@
+from collections import deque
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to an estimate
+    tiktoken = None
+from app.config import logger
+
+# Tokens the chat format adds to every message, and before the reply (OpenAI's token counting recipe)
+MESSAGE_OVERHEAD = 3
+REPLY_PRIMING = 3
+# Without a tokenizer, English text averages about four bytes per token, so counting three overestimates
+FALLBACK_BYTES_PER_TOKEN = 3
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+def _load_encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:  # A model tiktoken doesn't know yet
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:  # e.g. the encoding file could not be downloaded
+        logger.warning(f"Estimating token counts for {model}, tiktoken encoding unavailable: {e!r}")
+        return None
+
+
+class Tokenizer:
+    """Count and truncate text in a model's tokens, estimating them when tiktoken is unavailable."""
+
+    def __init__(self, model):
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+    @property
+    def exact(self):
+        return self.encoding is not None
+
+    def _encode(self, text):
+        # User text may contain special-token markers like <|endoftext|>; count them as plain text
+        return self.encoding.encode(text, disallowed_special=())
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self._encode(text))
+        return -(-len(text.encode('utf-8')) // FALLBACK_BYTES_PER_TOKEN)
+
+    def truncate(self, text, max_tokens):
+        """Return the longest prefix of text that is at most max_tokens long."""
+        max_tokens = max(max_tokens, 0)
+        if self.encoding is not None:
+            tokens = self._encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            text = self.encoding.decode(tokens[:max_tokens])
+            # Decoding can split a character and re-encode longer; trim until the count holds
+            while text and self.count(text) > max_tokens:
+                text = text[:-1]
+            return text
+        data = text.encode('utf-8')[:max_tokens * FALLBACK_BYTES_PER_TOKEN]
+        return data.decode('utf-8', errors='ignore')
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model) -> Tokenizer:
+    return Tokenizer(model)
+
+
+class ConversationWindow:
+    """The messages of one conversation, kept within a per-request token budget.
+
+    The system prompt is always sent first. Recent turns follow in full; once
+    they no longer fit, the oldest leave the window and wait for compact() to
+    fold them into a rolling summary sent after the system prompt. Every
+    message is counted once, when it is added, and the window keeps a running
+    total, so adding a turn costs one tokenization however long the chat is.
+
+    budget covers everything sent (messages, format overhead and reply
+    priming) but not the reply itself. A single message too long for the
+    window on its own is truncated, so the newest turn is always sent.
+    """
+
+    def __init__(self, system_prompt, budget, summary_budget, tokenizer: Tokenizer):
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.system_prompt = system_prompt
+        self.system_tokens = self._message_tokens('system', system_prompt)
+        self.summary = ''
+        self.summary_tokens = 0
+        summary_reserve = self._message_tokens('system', SUMMARY_PREFIX) + summary_budget
+        # Room for turns next to the system prompt and a full-size summary, so a new summary never evicts turns
+        self.max_turn_tokens = budget - REPLY_PRIMING - self.system_tokens - summary_reserve
+        if self.max_turn_tokens <= MESSAGE_OVERHEAD * 2:
+            raise ValueError(f"A {budget} token budget leaves no room for turns after the system prompt and summary")
+        self._turns = deque()  # (message, tokens), oldest first
+        self._turn_tokens = 0
+        self._evicted = deque()  # (message, tokens) that left the window but are not summarized yet
+        self._evicted_tokens = 0
+
+    def _message_tokens(self, role, content):
+        return MESSAGE_OVERHEAD + self.tokenizer.count(role) + self.tokenizer.count(content)
+
+    @property
+    def tokens(self):
+        """Tokens the next request will use, before the reply."""
+        return REPLY_PRIMING + self.system_tokens + self.summary_tokens + self._turn_tokens
+
+    @property
+    def pending(self):
+        """Turns that left the window and are waiting for compact()."""
+        return [message for message, _ in self._evicted]
+
+    def add(self, role, content):
+        """Append a turn, moving the oldest turns out of the window if it no longer fits."""
+        tokens = self._message_tokens(role, content)
+        limit = self.max_turn_tokens - self._message_tokens(role, '')
+        while tokens > self.max_turn_tokens and limit > 0:
+            content = self.tokenizer.truncate(content, limit)
+            tokens = self._message_tokens(role, content)
+            limit -= 1
+        self._turns.append(({'role': role, 'content': content}, tokens))
+        self._turn_tokens += tokens
+        self._fit()
+
+    def _fit(self):
+        while self._turn_tokens > self.max_turn_tokens:
+            message, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            self._evicted.append((message, tokens))
+            self._evicted_tokens += tokens
+        # If summarizing keeps failing, the backlog is capped at one window's worth of the newest turns
+        while self._evicted_tokens > self.max_turn_tokens and len(self._evicted) > 1:
+            _, tokens = self._evicted.popleft()
+            self._evicted_tokens -= tokens
+
+    def _set_summary(self, summary):
+        summary = self.tokenizer.truncate(summary.strip(), self.summary_budget)
+        self.summary = summary
+        self.summary_tokens = self._message_tokens('system', SUMMARY_PREFIX + summary) if summary else 0
+
+    async def compact(self, summarize):
+        """Fold turns that left the window into the rolling summary via `await summarize(summary, messages)`.
+
+        Does nothing while every turn still fits, so the summary is only
+        regenerated when the window moves. If summarize raises, the turns stay
+        pending for the next call and the error propagates.
+        """
+        if not self._evicted:
+            return
+        batch = list(self._evicted)
+        summary = await summarize(self.summary, [message for message, _ in batch])
+        for entry in batch:
+            if self._evicted and self._evicted[0] is entry:
+                self._evicted.popleft()
+                self._evicted_tokens -= entry[1]
+        self._set_summary(summary)
+
+    def messages(self):
+        """The chat completion messages for the next request: system prompt, summary, then recent turns."""
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        if self.summary:
+            messages.append({'role': 'system', 'content': SUMMARY_PREFIX + self.summary})
+        messages.extend(message for message, _ in self._turns)
+        return messages
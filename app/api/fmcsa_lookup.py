@@ -1,4 +1,123 @@
-import requests
+import asyncio
+import httpx
+from app.config import (
+    FMCSA_API_KEY,
+    FMCSA_MAX_CONCURRENCY,
+    FMCSA_DEADLINE_SECONDS,
+    FMCSA_RETRY_ATTEMPTS,
+    FMCSA_HEDGE_AFTER_SECONDS,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    logger
+)
+from app.api.http import get_http_client
+from app.api import resilience
+from app.api.carrier_summary import CarrierSummary
+
+FMCSA_BASE_URL = "https://mobile.fmcsa.dot.gov/qc/services/carriers"
+
+# Bounds how many FMCSA requests are in flight at once across all chats
+_fmcsa_slots = asyncio.Semaphore(FMCSA_MAX_CONCURRENCY)
+
+# Network errors and 429/5xx responses are retried; other non-200 responses mean "not found"
+_retry = resilience.RetryPolicy(
+    attempts=FMCSA_RETRY_ATTEMPTS,
+    base_delay=RETRY_BASE_DELAY,
+    max_delay=RETRY_MAX_DELAY,
+    retry_on=(httpx.HTTPError,)
+)
+
+# Errors a lookup reports as "service unavailable" rather than raising
+LOOKUP_ERRORS = (httpx.HTTPError, asyncio.TimeoutError, resilience.CircuitOpenError)
+
+def _breaker(endpoint):
+    return resilience.get_breaker(
+        f'fmcsa_{endpoint}',
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_SECONDS
+    )
+
+async def _get(path, headers=None):
+    async with _fmcsa_slots:
+        response = await get_http_client().get(
+            f"{FMCSA_BASE_URL}/{path}", params={'webKey': FMCSA_API_KEY}, headers=headers
+        )
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+async def get_carrier_response(path, endpoint='dot', headers=None):
+    """GET an FMCSA carrier endpoint and return the httpx response.
+
+    Calls go through the endpoint's circuit breaker and are retried with
+    jittered backoff within FMCSA_DEADLINE_SECONDS. Raises httpx.HTTPError,
+    asyncio.TimeoutError or resilience.CircuitOpenError when FMCSA can't be
+    reached in time.
+    """
+    return await resilience.call(
+        lambda: _get(path, headers),
+        _breaker(endpoint),
+        FMCSA_DEADLINE_SECONDS,
+        retry=_retry,
+        hedge_after=FMCSA_HEDGE_AFTER_SECONDS or None
+    )
+
+async def get_carrier_json(path, endpoint='dot'):
+    """GET an FMCSA carrier endpoint and return the decoded JSON, or None on a non-200 response."""
+    response = await get_carrier_response(path, endpoint)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+def _carrier_path(number_type, number):
+    return (number, 'dot') if number_type == 'DOT' else (f"docket-number/{number}", 'docket')
+
+def _verification_result(number_type, number, json_response):
+    """Turn an FMCSA carrier response body into a verification result dict with a CarrierSummary as its data."""
+    content = json_response.get("content") if json_response else None
+    if not content:
+        label = 'DOT' if number_type == 'DOT' else 'MC'
+        return {'status': 'not_verified', 'message': f'{label} info not found. Please re-enter an MC or DOT number.'}
+    if number_type == 'DOT':
+        summary = CarrierSummary.from_fmcsa(content)
+    else:
+        summary = CarrierSummary.from_fmcsa(content[0], mc_number=number)
+    return {'status': 'verified', 'message': 'MC/DOT number verified.', 'data': summary}
+
+async def _lookup(number_type, number):
+    path, endpoint = _carrier_path(number_type, number)
+    try:
+        json_response = await get_carrier_json(path, endpoint=endpoint)
+    except LOOKUP_ERRORS as e:
+        logger.error(f"FMCSA {number_type} lookup failed: {e!r}")
+        return {'status': 'error', 'message': 'The FMCSA lookup service is unavailable. Please try again later.'}
+    return _verification_result(number_type, number, json_response)
+
+async def lookup_dot(number):
+    """Look up a carrier by DOT number and return a verification result dict with a CarrierSummary as its data."""
+    return await _lookup('DOT', number)
+
+async def lookup_mc(number):
+    """Look up a carrier by MC (docket) number and return a verification result dict with a CarrierSummary as its data."""
+    return await _lookup('MC', number)
+
+async def recheck_carrier(number_type, number, etag=None):
+    """Re-fetch a carrier, sending etag as If-None-Match when FMCSA provided one last time.
+
+    Returns (result, etag). result is None when FMCSA answered 304 Not Modified.
+    """
+    path, endpoint = _carrier_path(number_type, number)
+    try:
+        response = await get_carrier_response(path, endpoint, headers={'If-None-Match': etag} if etag else None)
+    except LOOKUP_ERRORS as e:
+        logger.error(f"FMCSA {number_type} recheck failed: {e!r}")
+        return {'status': 'error', 'message': 'The FMCSA lookup service is unavailable.'}, etag
+    if response.status_code == 304:
+        return None, etag
+    json_response = response.json() if response.status_code == 200 else None
+    return _verification_result(number_type, number, json_response), response.headers.get('ETag')
 
 def fetch_company_details(company_data):
     """Fetch and format company details using FMCSA API."""
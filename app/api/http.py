@@ -0,0 +1,29 @@
+import httpx
+from app.config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS
+)
+
+_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+            ),
+        )
+    return _client
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,164 @@
+import asyncio
+import random
+import time
+from app.config import logger
+from app import metrics
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+# Gauge values published for each breaker state
+STATE_GAUGES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after consecutive failures, then probe it again after reset_timeout.
+
+    closed: calls go through; failure_threshold consecutive failures open the breaker.
+    open: calls fail fast with CircuitOpenError until reset_timeout has passed.
+    half_open: a single probe call goes through; success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        metrics.set_gauge(f'breaker.{name}.state', STATE_GAUGES[CLOSED])
+
+    def _transition(self, state):
+        if state != self.state:
+            log = logger.warning if state == OPEN else logger.info
+            log(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+            metrics.set_gauge(f'breaker.{self.name}.state', STATE_GAUGES[state])
+            metrics.increment(f'breaker.{self.name}.{state}')
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            metrics.increment(f'breaker.{self.name}.rejected')
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        self._transition(CLOSED)
+
+    def abandon(self):
+        """Free a half-open probe slot without judging the endpoint (e.g. the call was cancelled)."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self._transition(OPEN)
+
+
+# Errors worth another try when a policy doesn't name its own; anything else (a 400, bad credentials) fails at once
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+
+class RetryPolicy:
+    """Up to `attempts` tries with full-jitter exponential backoff between them, for errors in retry_on."""
+
+    def __init__(self, attempts=3, base_delay=0.2, max_delay=2.0, retry_on=TRANSIENT_ERRORS):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def backoff(self, attempt):
+        """Seconds to wait after the given (0-based) failed attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+_breakers = {}
+
+
+def get_breaker(name, **kwargs):
+    """Return the process-wide breaker for an endpoint, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+    return breaker
+
+
+async def hedged(func, hedge_after):
+    """Await func(); if it hasn't finished after hedge_after seconds, race a second call and keep the first success.
+
+    Only use this for idempotent calls.
+    """
+    first = asyncio.ensure_future(func())
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        metrics.increment('resilience.hedge.sent')
+        tasks.add(asyncio.ensure_future(func()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        metrics.increment('resilience.hedge.won')
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call(func, breaker, deadline, retry=NO_RETRY, hedge_after=None):
+    """Await func() through a circuit breaker, retrying failures within an overall deadline.
+
+    Each attempt gets whatever is left of `deadline` seconds, and a retry is
+    only started if its backoff ends before the deadline. Raises
+    CircuitOpenError when the breaker rejects the call, asyncio.TimeoutError
+    when the deadline runs out, and otherwise the last attempt's error.
+    """
+    deadline_at = time.monotonic() + deadline
+    for attempt in range(retry.attempts):
+        breaker.before_call()
+        remaining = deadline_at - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{breaker.name} deadline of {deadline}s exceeded")
+            started = time.monotonic()
+            attempt_call = hedged(func, hedge_after) if hedge_after else func()
+            result = await asyncio.wait_for(attempt_call, timeout=remaining)
+        except retry.retry_on + (asyncio.TimeoutError,) as e:
+            breaker.record_failure()
+            metrics.increment(f'resilience.{breaker.name}.failure')
+            delay = retry.backoff(attempt)
+            if attempt + 1 >= retry.attempts or time.monotonic() + delay >= deadline_at:
+                raise
+            logger.info(f"{breaker.name} attempt {attempt + 1} failed ({e!r}), retrying in {delay:.2f}s")
+            metrics.increment(f'resilience.{breaker.name}.retry')
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.abandon()
+            raise
+        else:
+            breaker.record_success()
+            metrics.observe(f'resilience.{breaker.name}.latency_seconds', time.monotonic() - started)
+            return result
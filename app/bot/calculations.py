@@ -1,108 +1,202 @@
-from pymongo import MongoClient, errors
-from app.config import MONGO_CLIENT, EQUIPMENT_TYPE_MULTIPLIERS
+import asyncio
+from pymongo import errors
+from app.config import (
+    EQUIPMENT_TYPE_MULTIPLIERS,
+    RATE_SOURCE,
+    LANE_INDEX_ENABLED,
+    RATE_TOLERANCE_RINGS,
+    RATE_MIN_SAMPLES,
+    QUOTE_CACHE_SIZE,
+    QUOTE_CACHE_TTL,
+    QUOTE_HISTORY_TIMEOUT,
+    RATE_QUERY_MAX_TIME_MS,
+    logger
+)
+from app.cache import TTLCache
+from app.singleflight import SingleFlight
+from app import metrics
+from app.db.mongo import hiveData, run_db_cancellable, add_ingest_listener
+from app.db.lane_stats import fetch_lane_rings
+from app.db.lane_index import lane_index
+from app.db.normalize import SHIPPER_CITY_KEY, CONSIGNEE_CITY_KEY, city_key
+from app.db.pipelines import build_rate_window_pipeline, facet_ring_results, select_ring
+
+
+def _parse_number(value, suffix):
+    """Parse a mileage/weight value that may be an int or a string like '1,200 lbs'."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(str(value).replace(suffix, '').replace(',', '').strip())
+
+
+def _aggregate_rings(shipper_city, consignee_city, equipment, bill_distance, weight, comment=None):
+    """Average the raw hive-cx-data loads in every tolerance ring with one $facet query."""
+    pipeline = build_rate_window_pipeline(shipper_city, consignee_city, equipment, bill_distance, weight,
+                                          RATE_TOLERANCE_RINGS)
+    cursor = hiveData.aggregate(pipeline, maxTimeMS=RATE_QUERY_MAX_TIME_MS, comment=comment)
+    return facet_ring_results(list(cursor), RATE_TOLERANCE_RINGS)
+
+
+def historical_rate_window(shipper_city, consignee_city, equipment, bill_distance, weight, comment=None):
+    """Look up the historical average rate for a lane and trailer type using the configured source.
+
+    Returns the tightest tolerance ring with enough samples (see
+    app.db.pipelines.select_ring), or None if the lane has no similar loads.
+    `comment` tags the MongoDB query so it can be killed if the quote is cancelled.
+    """
+    if LANE_INDEX_ENABLED and lane_index.has_lane(shipper_city, consignee_city, equipment):
+        return lane_index.widening_window(
+            shipper_city, consignee_city, equipment, bill_distance, weight,
+            RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES
+        )
+    if RATE_SOURCE == 'aggregate':
+        results = _aggregate_rings(shipper_city, consignee_city, equipment, bill_distance, weight, comment)
+    else:
+        results = fetch_lane_rings(shipper_city, consignee_city, equipment, bill_distance, weight,
+                                   RATE_TOLERANCE_RINGS, comment=comment)
+    return select_ring(results, RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES)
+
+
+def quote_cache_key(criteria):
+    """Normalize parsed load criteria into the key used by the quote cache.
+
+    Distance and weight are kept exact: the tolerance window, and so the
+    quoted rate, is centred on them, so loads in the same lane_stats bucket
+    can still get different quotes.
+    """
+    return (
+        city_key(criteria['shipper_city']),
+        city_key(criteria['consignee_city']),
+        criteria['trailer_type'],
+        criteria['bill_distance'],
+        criteria['weight'],
+        criteria['hazmat_routing'].upper(),
+        str(criteria['driver_assistance']).upper()
+    )
+
+
+def invalidate_quote_cache(document=None):
+    """Drop cached quotes for the lane of an ingested load, or all of them after a bulk change.
+
+    Listeners only hear about writes made inside the bot process. Running
+    `python -m app.db.lane_stats` or `app.db.migrations` separately does not
+    reach them, so quotes cached before such a run are served until they
+    expire after QUOTE_CACHE_TTL seconds.
+    """
+    if not document or not document.get(SHIPPER_CITY_KEY):
+        quote_cache.clear()
+        return
+    lane = (document.get(SHIPPER_CITY_KEY), document.get(CONSIGNEE_CITY_KEY))
+    dropped = quote_cache.invalidate_where(lambda key: key[:2] == lane)
+    logger.debug(f"Dropped {dropped} cached quotes for {lane}")
+
+
+# Holds the historical quote message for a key, or None when the lane has no similar loads
+quote_cache = TTLCache(maxsize=QUOTE_CACHE_SIZE, ttl=QUOTE_CACHE_TTL)
+add_ingest_listener(invalidate_quote_cache)
+metrics.register_cache('rate_quotes', quote_cache)
+_NOT_CACHED = object()
+rate_flights = SingleFlight('rate_quotes')
+
+
+def parse_load_criteria(load_criteria: dict) -> dict:
+    """Pull the typed quote inputs out of extracted load criteria.
+
+    Raises KeyError, AttributeError or ValueError when a field is missing or malformed.
+    """
+    return {
+        'shipper_city': load_criteria["shipperCity"],
+        'consignee_city': load_criteria["consigneeCity"],
+        'bill_distance': _parse_number(load_criteria["billDistance"], ' miles'),
+        'weight': _parse_number(load_criteria["weight"], ' lbs'),
+        'driver_assistance': load_criteria["driverAssistance"],
+        'trailer_type': load_criteria["equipmentType"].upper(),
+        'hazmat_routing': load_criteria.get("hazmatRouting", "No").upper(),
+        'tolls': load_criteria.get("Tolls", 'No')
+    }
+
+
+def formula_rate_quote(criteria: dict) -> str:
+    """Estimate a rate from the per-mile formula; needs no database access."""
+    equipment_base_rate = {
+        'V': 1.45,   # Van
+        'R': 1.60,   # Reefer
+        'F': 1.75,   # Flatbed
+    }
+    bill_distance = criteria['bill_distance']
+
+    base_rate = bill_distance * equipment_base_rate.get(criteria['trailer_type'], 1.45)  # Default to 1.45 if unknown
+
+    if base_rate < 350:
+        base_rate = 350
+
+    total_rate = base_rate + (bill_distance * 0.5)
+
+    if criteria['driver_assistance'] == 'Yes':
+        total_rate += 100
+    if criteria['hazmat_routing'] == 'Yes':
+        total_rate += 200
+    if criteria['driver_assistance'] == 'Yes':
+        total_rate += 100
+    if criteria['tolls'] == 'Yes':
+        total_rate += 50
+
+    return f"Based on my analysis and calculations of the information provided, the estimated rate is: ${total_rate:.2f}"
+
+
+def cached_rate_quote(criteria: dict):
+    """Return the cached historical quote for these criteria, or None without touching MongoDB."""
+    return quote_cache.get(quote_cache_key(criteria))
+
+
+async def historical_rate_quote(criteria: dict):
+    """Quote from historically similar loads, or return None when the lane has none.
+
+    Raises asyncio.TimeoutError after QUOTE_HISTORY_TIMEOUT seconds and
+    pymongo errors when the database fails. Timing out or cancelling the
+    caller kills the query on the server as well.
+    """
+    cache_key = quote_cache_key(criteria)
+    cached = quote_cache.get(cache_key, _NOT_CACHED)
+    if cached is not _NOT_CACHED:
+        return cached
+
+    # Identical quotes requested while the query is running share its result
+    result = await rate_flights.do(cache_key, lambda: asyncio.wait_for(
+        run_db_cancellable(historical_rate_window, criteria['shipper_city'], criteria['consignee_city'],
+                           criteria['trailer_type'], criteria['bill_distance'], criteria['weight']),
+        timeout=QUOTE_HISTORY_TIMEOUT
+    ))
+
+    message = None
+    if result:
+        average_rate = float(result['averageRate']) * 1.06
+        message = (
+            f"The estimated rate based on {result['count']} historically similar loads "
+            f"(within {result['distanceTolerance']} miles and {result['weightTolerance']} lbs) "
+            f"is: ${average_rate:.2f}"
+        )
+    quote_cache.set(cache_key, message)
+    return message
+
 
 async def calculate_approximate_rate_quote(load_criteria: dict, update, context):
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
-    
+
+    try:
+        criteria = parse_load_criteria(load_criteria)
+    except (KeyError, AttributeError, ValueError) as e:
+        return f"Sorry, I couldn't process that rate due to an error: {e}"
+
     try:
-        distance_tolerance = 60
-        weight_tolerance = 3500
-        
-        hazmat_routing = load_criteria.get("hazmatRouting", "No").upper()
-        shipper_city = load_criteria["shipperCity"]
-        consignee_city = load_criteria["consigneeCity"]
-        bill_distance = int(load_criteria["billDistance"].replace(' miles', '').strip())
-        weight = int(load_criteria["weight"].replace(' lbs', '').replace(',', '').strip())
-        driver_assistance = load_criteria["driverAssistance"]
-        trailer_type = load_criteria["equipmentType"].upper()
-        
-        pipeline = [
-            {
-                '$match': {
-                    'Shipper city': {'$eq': shipper_city.upper()},
-                    'Consignee city': {'$eq': consignee_city.upper()},
-                    'Bill Distance': {'$exists': True, '$ne': None},
-                    'Weight': {'$exists': True, '$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'normalizedBillDistance': {
-                        '$cond': {
-                            'if': {'$eq': [{'$type': '$Bill Distance'}, 'undefined']},
-                            'then': 0,
-                            'else': {'$toDouble': '$Bill Distance'}
-                        }
-                    },
-                    'normalizedWeight': {
-                        '$cond': {
-                            'if': {'$eq': [{'$type': '$Weight'}, 'undefined']},
-                            'then': 0,
-                            'else': {'$toDouble': '$Weight'}
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'normalizedBillDistance': {
-                        '$gte': bill_distance - distance_tolerance,
-                        '$lte': bill_distance + distance_tolerance
-                    },
-                    'normalizedWeight': {
-                        '$gte': weight - weight_tolerance,
-                        '$lte': weight + weight_tolerance
-                    }
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'averageRate': {'$avg': '$Rate'}
-                }
-            }
-        ]
-        client = MongoClient(MONGO_CLIENT)
-        db = client['hivedb']
-        data = db['hive-cx-data']
-        cursor = data.aggregate(pipeline, maxTimeMS=90000)
-        result = list(cursor)
-        
-        if result and 'averageRate' in result[0]:
-            average_rate = float(result[0]['averageRate']) * 1.06
-            message = f"The estimated rate based on historically similar loads is: ${average_rate:.2f}"
-        else:
+        message = await historical_rate_quote(criteria)
+        if message is None:
             raise ValueError("No matching historical data found")
-    
-    except (errors.PyMongoError, ValueError) as e:
+    except (errors.PyMongoError, asyncio.TimeoutError, ValueError) as e:
         # If MongoDB fails or no matching data, calculate using the formula
-        logger.error(f"MongoDB error or no data found: {e}")
-        
-        equipment_base_rate = {
-            'V': 1.45,   # Van
-            'R': 1.60,   # Reefer
-            'F': 1.75,   # Flatbed
-        }
-
-        base_rate = bill_distance * equipment_base_rate.get(trailer_type, 1.45)  # Default to 1.45 if unknown
-        
-        if base_rate < 350:
-            base_rate = 350
-            
-        total_rate = base_rate + (bill_distance * 0.5)
-        
-        if driver_assistance == 'Yes':
-            total_rate += 100
-        if hazmat_routing == 'Yes':
-            total_rate += 200
-        if load_criteria.get("driverAssistance", 'No') == 'Yes':
-            total_rate += 100
-        if load_criteria.get("Tolls", 'No') == 'Yes':
-            total_rate += 50
-            
-        message = f"Based on my analysis and calculations of the information provided, the estimated rate is: ${total_rate:.2f}"
-    
+        logger.error(f"MongoDB error or no data found: {e!r}")
+        message = formula_rate_quote(criteria)
     except Exception as e:
         message = f"Sorry, I couldn't process that rate due to an error: {e}"
-        
+
     return message
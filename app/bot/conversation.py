@@ -0,0 +1,67 @@
+import asyncio
+from telegram import Update
+from telegram.ext import CallbackContext
+from app.config import (
+    OPENAI_MODEL,
+    GPT_STREAMING,
+    CONVERSATION_TOKEN_BUDGET,
+    CONVERSATION_SUMMARY_TOKENS,
+    logger
+)
+from app.api.chatbot import (
+    get_conversation_response,
+    stream_conversation,
+    summarize_conversation,
+    FALLBACK_REPLY
+)
+from app.api.context_window import ConversationWindow, get_tokenizer
+from app.bot.streaming import stream_reply
+
+# chat_data key holding the chat's ConversationWindow
+CONVERSATION_WINDOW = 'conversation'
+
+SYSTEM_PROMPT = (
+    "You are Hive Engine Logistics Bot, an assistant for shippers and carriers in the freight logistics industry. "
+    "Answer questions about rates, carriers, shipping best practices and industry regulations concisely and accurately. "
+    "Do not ask for or repeat sensitive information. "
+    "If the user wants a rate quote, tell them to reply 'Yes' or use /rate; for a carrier's safety rating, tell them "
+    "to use /lookup with an MC or DOT number."
+)
+
+
+async def load_tokenizer():
+    """Build the model's tokenizer off the event loop; tiktoken downloads and parses its BPE file on first use."""
+    return await asyncio.to_thread(get_tokenizer, OPENAI_MODEL)
+
+
+async def conversation_window(context: CallbackContext) -> ConversationWindow:
+    """Return the chat's conversation window, starting one on first use."""
+    window = context.chat_data.get(CONVERSATION_WINDOW)
+    if window is None:
+        tokenizer = await load_tokenizer()
+        # Another message from the chat may have started a window while the tokenizer loaded
+        window = context.chat_data.setdefault(CONVERSATION_WINDOW, ConversationWindow(
+            SYSTEM_PROMPT, CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKENS, tokenizer
+        ))
+    return window
+
+
+async def converse(update: Update, context: CallbackContext):
+    """Answer a free-form message with the chat's earlier turns, or their summary, as context."""
+    window = await conversation_window(context)
+    window.add('user', update.message.text)
+    try:
+        await window.compact(summarize_conversation)
+    except Exception as e:
+        # The window is within budget without the new summary; the turns are summarized on a later message
+        logger.warning(f"Conversation summary failed: {e!r}")
+
+    messages = window.messages()
+    logger.debug(f"Conversation request: {len(messages)} messages, {window.tokens} tokens")
+    if GPT_STREAMING:
+        reply = await stream_reply(update.message, stream_conversation(messages), FALLBACK_REPLY)
+    else:
+        reply = await get_conversation_response(messages)
+        await update.message.reply_text(reply)
+    if reply != FALLBACK_REPLY:
+        window.add('assistant', reply)
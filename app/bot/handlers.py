@@ -1,15 +1,25 @@
+import asyncio
+from pymongo import errors
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import CallbackContext, ConversationHandler
 from app.config import logger
 from app.bot.utils import (
-    check_membership, 
     verify_number, 
     handle_verification_failure, 
     extract_initial_load_criteria, 
     check_missing_or_unclear_fields,
-    get_gpt_help
+    reply_with_gpt_help
+)
+from app.bot.tasks import run_in_background, cancel_inflight
+from app.bot.membership import check_membership, track_active
+from app.bot.conversation import converse
+from app.db.sessions import get_session, save_session
+from app.bot.calculations import (
+    parse_load_criteria,
+    formula_rate_quote,
+    cached_rate_quote,
+    historical_rate_quote
 )
-from app.bot.calculations import calculate_approximate_rate_quote
 
 # Define states for conversation handler
 (START, ENTER_NUMBER, CONFIRM_COMPANY, AWAITING_RATE_COMMAND, 
@@ -21,6 +31,18 @@ async def start(update: Update, context: CallbackContext) -> int:
 
     logger.info("Start command invoked")
 
+    session = await get_session(update.effective_user.id)
+    if session:
+        # Verified recently: skip the membership and FMCSA checks until the session expires
+        track_active(update.effective_user.id)
+        context.user_data['company_details'] = session['company']
+        await update.message.reply_text(
+            f"Welcome back! You're verified as {session['company'].name}. "
+            "Use /rate for a rate quote or /lookup to check a carrier.",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        return AWAITING_RATE_COMMAND
+
     if not await check_membership(update, context):
         await update.message.reply_text('Sorry, this bot is only for members of our private channel.')
         return ConversationHandler.END
@@ -47,12 +69,13 @@ async def enter_number(update: Update, context: CallbackContext) -> int:
     response = await verify_number(number_type.upper(), number.strip(), context, update)
     
     if response['status'] == 'verified':
+        # A shared CarrierSummary, not the raw FMCSA payload
         context.user_data['company_details'] = response['data']
-        company_name = response['data']['carrier'].get('legalName') or response['data']['carrier'].get('dbaName', 'Unknown Company')
+        context.user_data['verified_number'] = {'numberType': number_type.upper(), 'number': number.strip()}
         
         reply_keyboard = [['YES', 'NO']]
         markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
-        await update.message.reply_text(f"Is {company_name} your company?", reply_markup=markup)
+        await update.message.reply_text(f"Is {response['data'].name} your company?", reply_markup=markup)
         return CONFIRM_COMPANY
     else:
         await update.message.reply_text("Your MC/DOT number could not be verified. Please try again.")
@@ -64,6 +87,15 @@ async def confirm_company(update: Update, context: CallbackContext) -> int:
     
     user_response = update.message.text.strip().upper()
     if user_response == 'YES':
+        company = context.user_data.get('company_details')
+        if company is not None:
+            verified_number = context.user_data.get('verified_number', {})
+            # Saved without holding up the reply (an unreachable MongoDB can take seconds), and not through
+            # run_in_background so that /cancel or a new quote can't abort the write; failures are logged there
+            context.application.create_task(
+                save_session(update.effective_user.id, company, verified_number.get('numberType'), verified_number.get('number')),
+                update=update
+            )
         await update.message.reply_text(
             "Your MC/DOT number is verified. You can now use the following commands:\n"
             "/help - See available commands.",
@@ -86,49 +118,84 @@ async def rate_quote(update: Update, context: CallbackContext) -> int:
         reply_markup=ReplyKeyboardRemove(),
     )
 
-    context.user_data['rate_quote_info'] = {}
+    context.user_data.pop('rate_quote_info', None)
     return INITIALIZE_RATE_QUOTE
 
 async def extract_and_calculate_rate_quote(update: Update, context: CallbackContext) -> int:
     """Extract load criteria and calculate the rate quote based on user input."""
     logger.info("extract_and_calculate_rate_quote function invoked")
+    cancel_inflight(context)  # A new load supersedes any quote still being worked on
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
 
-    load_criteria = await extract_initial_load_criteria(update, context)
+    # Fields from an earlier message that lacked some are kept, so the user only sends what was missing
+    load_criteria = await extract_initial_load_criteria(update, context, context.user_data.get('rate_quote_info'))
     logger.debug(f"Load criteria extracted: {load_criteria}")
 
-    if not load_criteria:
-        await update.message.reply_text("I couldn't understand the details you provided. Let me try to assist you better.")
-        gpt_response = await get_gpt_help(update.message.text)
-        await update.message.reply_text(gpt_response)
-        return INITIALIZE_RATE_QUOTE
-
     missing_fields = await check_missing_or_unclear_fields(load_criteria, update)
 
     if missing_fields:
+        context.user_data['rate_quote_info'] = load_criteria
         return INITIALIZE_RATE_QUOTE
+    context.user_data.pop('rate_quote_info', None)
 
     try:
-        rate_quote = await calculate_approximate_rate_quote(load_criteria, update, context)
-        logger.info(f"Calculated rate quote: {rate_quote}")
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"The estimated rate is: {rate_quote}")
-    except Exception as e:
-        await context.bot
-    except Exception as e:
+        criteria = parse_load_criteria(load_criteria.to_dict())
+    except (KeyError, AttributeError, ValueError) as e:
         logger.error(f"Error calculating rate quote: {e}")
         await context.bot.send_message(chat_id=update.effective_chat.id, text="Sorry, I encountered an issue while calculating the rate. Let me try another method.")
-        
+
         # Attempt fallback calculation using GPT or another method
-        gpt_response = await get_gpt_help(update.message.text)
-        await update.message.reply_text(gpt_response)
-        
+        run_in_background(context, reply_with_gpt_help(update, update.message.text), update=update)
+    else:
+        await send_progressive_rate_quote(update, context, criteria)
+
     await context.bot.send_message(chat_id=update.effective_chat.id, text="Please provide your feedback on the quote or let me know if you want to request another quote or switch to conversational mode.")
     return POST_RATE_ACTION
 
+async def send_progressive_rate_quote(update: Update, context: CallbackContext, criteria: dict):
+    """Reply with the formula estimate at once and refine it in place from historical loads."""
+    cached = cached_rate_quote(criteria)
+    if cached:
+        logger.info(f"Cached rate quote: {cached}")
+        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"The estimated rate is: {cached}")
+        return
+
+    formula_quote = formula_rate_quote(criteria)
+    message = await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"The estimated rate is: {formula_quote}\n\nChecking historically similar loads for a refined rate..."
+    )
+    run_in_background(context, refine_rate_quote(message, criteria, formula_quote), update=update)
+
+async def refine_rate_quote(message, criteria: dict, formula_quote: str):
+    """Edit the estimate message with the historical quote, or say why the formula estimate stands."""
+    try:
+        historical_quote = await historical_rate_quote(criteria)
+    except asyncio.CancelledError:
+        # /cancel or a newer load stopped the lookup; don't leave the "Checking..." line behind
+        await message.edit_text(
+            f"The estimated rate is: {formula_quote}\n\nThe historical rate lookup was cancelled, so this estimate stands."
+        )
+        raise
+    except (asyncio.TimeoutError, errors.ExecutionTimeout):
+        text = f"The estimated rate is: {formula_quote}\n\nThe historical rate lookup timed out, so this estimate stands."
+    except errors.PyMongoError as e:
+        logger.error(f"MongoDB error while refining rate quote: {e}")
+        text = f"The estimated rate is: {formula_quote}\n\nHistorical rates are unavailable right now, so this estimate stands."
+    else:
+        if historical_quote:
+            text = f"The estimated rate is: {historical_quote}"
+        else:
+            text = f"The estimated rate is: {formula_quote}\n\nNo historically similar loads were found, so this estimate stands."
+
+    logger.info(f"Refined rate quote: {text}")
+    await message.edit_text(text)
+
 async def post_rate_action(update: Update, context: CallbackContext) -> int:
     """Handle post-quote user actions."""
     user_response = update.message.text.strip().upper()
     if user_response == 'YES':
+        context.user_data.pop('rate_quote_info', None)
         await update.message.reply_text(
             "Please provide the new details for your rate quote.",
             reply_markup=ReplyKeyboardRemove()
@@ -138,11 +205,13 @@ async def post_rate_action(update: Update, context: CallbackContext) -> int:
         await update.message.reply_text("Thank you for using Hive Bot. Have a great day!", reply_markup=ReplyKeyboardRemove())
         return ConversationHandler.END
     else:
-        await update.message.reply_text("Have another load to quote? Please reply with 'Yes' to continue or 'No' to exit.")
+        # Anything else is conversational mode; the reply keeps the chat's earlier turns as context
+        run_in_background(context, converse(update, context), update=update)
         return POST_RATE_ACTION
 
 async def cancel(update: Update, context: CallbackContext) -> int:
     """Cancel the current operation."""
+    cancel_inflight(context)
     await update.message.reply_text('Operation cancelled.', reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
 
@@ -152,6 +221,7 @@ async def help_command(update: Update, context: CallbackContext):
         "/start - Start the bot and verify your MC/DOT number.\n"
         "/rate - Request a rate quote for a load.\n"
         "/lookup - Look up the safety rating of a company by MC/DOT number.\n"
+        "/watch - Get notified when a carrier's authority or safety rating changes (/unwatch, /watchlist).\n"
         "/cancel - Cancel the current operation.\n"
         "/help - Display this help message."
     )
@@ -0,0 +1,194 @@
+import re
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+
+# Equipment names users write, mapped to the trailer codes the rate formula and EQUIPMENT_TYPE_MULTIPLIERS use
+EQUIPMENT_CODES = {
+    'dry van': 'V',
+    'van': 'V',
+    'reefer': 'R',
+    'flatbed': 'F',
+    'power only': 'PO',
+    'flatbed moffett': 'FM',
+    'van moffett': 'VM',
+    'reefer moffett': 'RM',
+}
+
+# A load can't be quoted without these; the rest fall back to DEFAULTS
+REQUIRED_FIELDS = ('shipper_city', 'consignee_city', 'bill_distance', 'weight')
+DEFAULTS = {'equipment_type': 'V', 'hazmat_routing': 'No', 'driver_assistance': 'No'}
+
+FIELD_LABELS = {
+    'shipper_city': 'shipper city',
+    'consignee_city': 'consignee city',
+    'bill_distance': 'distance (miles)',
+    'weight': 'weight (lbs)',
+    'equipment_type': 'equipment type',
+    'hazmat_routing': 'hazmat (yes/no)',
+    'driver_assistance': 'driver assistance (yes/no)',
+}
+
+# Keys of the load criteria dict parse_load_criteria reads
+CRITERIA_KEYS = {
+    'shipper_city': 'shipperCity',
+    'consignee_city': 'consigneeCity',
+    'bill_distance': 'billDistance',
+    'weight': 'weight',
+    'equipment_type': 'equipmentType',
+    'hazmat_routing': 'hazmatRouting',
+    'driver_assistance': 'driverAssistance',
+}
+
+REGEX_PATTERNS = {
+    'shipper_city': r"\b(?:from|shipper|pickup|loading)\s*:?\s*([a-zA-Z\s]+),?\s*([a-zA-Z]{2})?\b",
+    'consignee_city': r"\b(?:to|consignee|delivery|unloading)\s*:?\s*([a-zA-Z\s]+),?\s*([a-zA-Z]{2})?\b",
+    'bill_distance': r"\b(\d[\d,]*)\s*miles",
+    'weight': r"\b(\d[\d,]*)\s*lbs",
+    'equipment_type': r"\b(flatbed moffett|van moffett|reefer moffett|dry van|van|reefer|flatbed|power only)\b",
+    'hazmat_routing': r"\b(no hazmat|hazmat)\b",
+    'driver_assistance': r"\b(no driver assist|driver assist)\b",
+}
+
+# JSON schema of each field for the extraction function; null means the message doesn't say
+FIELD_SCHEMAS = {
+    'shipper_city': {'type': ['string', 'null'], 'description': 'Pickup city and two-letter state, e.g. "Dallas, TX"'},
+    'consignee_city': {'type': ['string', 'null'], 'description': 'Delivery city and two-letter state, e.g. "Houston, TX"'},
+    'bill_distance': {'type': ['integer', 'null'], 'description': 'Trip distance in miles'},
+    'weight': {'type': ['integer', 'null'], 'description': 'Load weight in pounds'},
+    'equipment_type': {'type': ['string', 'null'], 'enum': [*EQUIPMENT_CODES, None], 'description': 'Trailer type'},
+    'hazmat_routing': {'type': ['boolean', 'null'], 'description': 'Whether the load is hazardous material'},
+    'driver_assistance': {'type': ['boolean', 'null'], 'description': 'Whether the driver must help load or unload'},
+}
+
+EXTRACTION_FUNCTION_NAME = 'record_load_criteria'
+
+
+def _city(value):
+    if isinstance(value, str) and value.strip():
+        return ' '.join(value.split())
+    return None
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    match = re.search(r"\d[\d,]*", str(value or ''))
+    if not match:
+        return None
+    return int(match.group().replace(',', '')) or None
+
+
+def _equipment(value):
+    if not isinstance(value, str):
+        return None
+    value = ' '.join(value.lower().split())
+    if value in EQUIPMENT_CODES:
+        return EQUIPMENT_CODES[value]
+    return value.upper() if value.upper() in EQUIPMENT_CODES.values() else None
+
+
+def _yes_no(value):
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('yes', 'y', 'true', 'hazmat', 'driver assist'):
+            return 'Yes'
+        if value in ('no', 'n', 'false') or value.startswith('no '):
+            return 'No'
+    return None
+
+
+_COERCE = {
+    'shipper_city': _city,
+    'consignee_city': _city,
+    'bill_distance': _number,
+    'weight': _number,
+    'equipment_type': _equipment,
+    'hazmat_routing': _yes_no,
+    'driver_assistance': _yes_no,
+}
+
+
+@dataclass(frozen=True)
+class LoadCriteria:
+    """The details of a load to quote, as far as they are known; None marks a field nobody has supplied."""
+    shipper_city: Optional[str] = None
+    consignee_city: Optional[str] = None
+    bill_distance: Optional[int] = None
+    weight: Optional[int] = None
+    equipment_type: Optional[str] = None  # A trailer code from EQUIPMENT_CODES
+    hazmat_routing: Optional[str] = None  # 'Yes' or 'No'
+    driver_assistance: Optional[str] = None  # 'Yes' or 'No'
+
+    @classmethod
+    def from_arguments(cls, arguments: dict) -> 'LoadCriteria':
+        """Build criteria from extraction function arguments, dropping unknown keys and unusable values."""
+        return cls(**{
+            name: _COERCE[name](value)
+            for name, value in (arguments or {}).items()
+            if name in _COERCE
+        })
+
+    def unfilled(self):
+        """Names of the fields still unknown, required or not."""
+        return [field.name for field in fields(self) if getattr(self, field.name) is None]
+
+    def missing(self):
+        """Names of the required fields still unknown."""
+        return [name for name in REQUIRED_FIELDS if getattr(self, name) is None]
+
+    def merge(self, other: 'LoadCriteria') -> 'LoadCriteria':
+        """Fill this criteria's unknown fields from other; known fields are kept."""
+        return replace(self, **{
+            name: getattr(other, name)
+            for name in self.unfilled()
+            if getattr(other, name) is not None
+        })
+
+    def to_dict(self) -> dict:
+        """The load criteria dict parse_load_criteria expects, with defaults for unknown optional fields."""
+        return {
+            key: getattr(self, name) if getattr(self, name) is not None else DEFAULTS.get(name)
+            for name, key in CRITERIA_KEYS.items()
+        }
+
+
+def parse_load_message(text: str, fields_wanted=None) -> LoadCriteria:
+    """Regex pass over a user's message; fills only the fields it recognizes (of fields_wanted, if given)."""
+    text = text.lower()
+    values = {}
+    for name, pattern in REGEX_PATTERNS.items():
+        if fields_wanted is not None and name not in fields_wanted:
+            continue
+        match = re.search(pattern, text)
+        if not match:
+            continue
+        if name in ('shipper_city', 'consignee_city'):
+            values[name] = f"{match.group(1).strip()}, {match.group(2) or ''}".strip(', ')
+        else:
+            values[name] = match.group(1)
+    return LoadCriteria.from_arguments(values)
+
+
+def extraction_function(field_names) -> dict:
+    """The JSON-schema function the model calls to report field_names, and only those."""
+    return {
+        'name': EXTRACTION_FUNCTION_NAME,
+        'description': 'Record the details of a freight load described in a message.',
+        'parameters': {
+            'type': 'object',
+            'properties': {name: FIELD_SCHEMAS[name] for name in field_names},
+            'required': list(field_names),
+            'additionalProperties': False,
+        },
+    }
+
+
+def extraction_prompt(text: str) -> str:
+    return (
+        "Extract the freight load details from this message. "
+        f"Use null for anything the message does not state; do not guess.\n\nMessage: {text}"
+    )
@@ -1,15 +1,207 @@
+import asyncio
+import csv
+import html
+import io
+import re
+import time
 from telegram import Update, ReplyKeyboardRemove
+from telegram.error import BadRequest
 from telegram.ext import CallbackContext, ConversationHandler
-from app.bot.utils import verify_number, handle_verification_failure
+from app.config import (
+    BULK_LOOKUP_MAX_NUMBERS,
+    BULK_LOOKUP_CONCURRENCY,
+    BULK_LOOKUP_PROGRESS_SECONDS,
+    BULK_LOOKUP_TABLE_ROWS,
+    logger
+)
+from app.api.carrier_cache import cache_key
+from app.api.carrier_summary import CarrierSummary
+from app.bot.utils import verify_number, resolve_number, handle_verification_failure
+from app.bot.tasks import run_in_background, cancel_inflight
+from app.bot.handlers import LOOKUP_NUMBER
 
-# Define states for the conversation handler specific to lookup
-LOOKUP_NUMBER = 1
+# "MC 123456", "MC123456", "DOT: 654321", "mc-123456", or a "MC,123456" CSV row
+NUMBER_PATTERN = re.compile(r'\b(MC|DOT)[\s#:,;\-]*(\d{1,8})\b', re.IGNORECASE)
+
+# Largest CSV upload accepted, in bytes
+MAX_LOOKUP_FILE_BYTES = 1024 * 1024
+
+CSV_COLUMNS = [
+    'query', 'status', 'legal_name', 'dba_name', 'dot_number', 'mc_number', 'allowed_to_operate',
+    'safety_rating', 'operation_type', 'drivers', 'inspections', 'address', 'message'
+]
+
+def parse_lookup_numbers(text: str) -> list:
+    """Return the unique (type, number) pairs found in text, in the order they first appear."""
+    seen = set()
+    numbers = []
+    for number_type, number in NUMBER_PATTERN.findall(text):
+        number_type = number_type.upper()
+        key = cache_key(number_type, number)
+        if key not in seen:
+            seen.add(key)
+            numbers.append((number_type, number))
+    return numbers
+
+def parse_lookup_csv(data: bytes) -> list:
+    """Return the unique (type, number) pairs in an uploaded CSV.
+
+    A header naming a DOT or MC/docket column selects bare numbers from it,
+    preferring DOT when a row has both; otherwise every cell is scanned for
+    "MC 123456" style values. A first row holding any digits is data, not a
+    header, so headerless "MC,123456" rows are scanned too.
+    """
+    text = data.decode('utf-8-sig', errors='replace')
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    if any(re.search(r'\d', cell) for cell in rows[0]):
+        return parse_lookup_numbers(text)
+
+    columns = {}
+    for index, name in enumerate(rows[0]):
+        name = name.strip().upper()
+        if name.startswith(('DOT', 'USDOT')):
+            columns.setdefault('DOT', index)
+        elif name.startswith(('MC', 'DOCKET')):
+            columns.setdefault('MC', index)
+    if not columns:
+        return parse_lookup_numbers(text)
+
+    lines = []
+    for row in rows[1:]:
+        for number_type in ('DOT', 'MC'):
+            index = columns.get(number_type)
+            if index is not None and index < len(row) and row[index].strip():
+                lines.append(f"{number_type} {row[index].strip()}")
+                break
+    return parse_lookup_numbers('\n'.join(lines))
+
+def carrier_row(number_type: str, number: str, response: dict) -> dict:
+    """Flatten one lookup result into a table/CSV row."""
+    row = dict.fromkeys(CSV_COLUMNS, '')
+    row['query'] = f"{number_type} {number}"
+    row['status'] = response['status']
+    if response['status'] == 'verified':
+        row.update({key: value for key, value in response['data'].to_dict().items() if value is not None})
+        row['legal_name'] = response['data'].name
+    else:
+        row['message'] = response.get('message', '')
+    return row
+
+def format_carrier_details(carrier: CarrierSummary) -> str:
+    """Render one carrier for the single-number /lookup reply."""
+    return (
+        f"**Carrier Information**\n"
+        f"Legal Name: {carrier.name}\n"
+        f"DBA Name: {carrier.dba_name or 'N/A'}\n"
+        f"DOT Number: {carrier.dot_number or 'N/A'}\n"
+        f"MC Number: {carrier.mc_number or 'N/A'}\n"
+        f"Allowed to Operate: {carrier.allowed_to_operate or 'Unknown'}\n"
+        f"Safety Rating: {carrier.safety_rating or 'No safety rating available'}\n"
+        f"Operation Type: {carrier.operation_type or 'Unknown Operation Type'}\n"
+        f"Total Drivers: {carrier.drivers if carrier.drivers is not None else 'N/A'}\n"
+        f"Total Inspections: {carrier.inspections if carrier.inspections is not None else 'N/A'}\n"
+        f"Physical Address: {carrier.address or 'No address available'}\n"
+    )
+
+def format_lookup_table(rows: list) -> str:
+    """Render rows as a fixed-width HTML <pre> table."""
+    lines = [f"{'Query':<14} {'Status':<12} {'OK':<3} Name"]
+    for row in rows:
+        allowed = {'Y': 'yes', 'N': 'no'}.get(str(row['allowed_to_operate']), '')
+        lines.append(f"{row['query']:<14} {row['status']:<12} {allowed:<3} {str(row['legal_name'])[:28]}")
+    return f"<pre>{html.escape(chr(10).join(lines))}</pre>"
+
+def format_lookup_csv(rows: list) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+async def edit_progress(message, text: str):
+    try:
+        await message.edit_text(text)
+    except BadRequest as e:  # e.g. "message is not modified"
+        logger.debug(f"Skipped lookup progress edit: {e}")
+
+async def resolve_numbers(numbers: list, on_progress=None) -> dict:
+    """Look up every (type, number) pair with at most BULK_LOOKUP_CONCURRENCY in flight.
+
+    Returns results keyed on the pair. on_progress(done, verified) is awaited
+    as results arrive, at most every BULK_LOOKUP_PROGRESS_SECONDS.
+    """
+    slots = asyncio.Semaphore(BULK_LOOKUP_CONCURRENCY)
+
+    async def resolve(number_type, number):
+        async with slots:
+            try:
+                return (number_type, number), await resolve_number(number_type, number)
+            except Exception as e:
+                logger.error(f"Bulk lookup of {number_type} {number} failed: {e!r}")
+                return (number_type, number), {'status': 'error', 'message': 'Lookup failed.'}
+
+    tasks = [asyncio.ensure_future(resolve(number_type, number)) for number_type, number in numbers]
+    results = {}
+    verified = 0
+    reported_at = time.monotonic()
+    try:
+        for finished in asyncio.as_completed(tasks):
+            pair, response = await finished
+            results[pair] = response
+            verified += response['status'] == 'verified'
+            if on_progress and len(results) < len(numbers) and time.monotonic() - reported_at >= BULK_LOOKUP_PROGRESS_SECONDS:
+                reported_at = time.monotonic()
+                await on_progress(len(results), verified)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return results
+
+async def run_bulk_lookup(update: Update, progress_message, numbers: list):
+    """Resolve a list of carriers, streaming progress into progress_message, then reply with the results."""
+    total = len(numbers)
+
+    async def on_progress(done, verified):
+        await edit_progress(progress_message, f"Checked {done} of {total} carriers ({verified} verified)...")
+
+    started = time.monotonic()
+    results = await resolve_numbers(numbers, on_progress)
+    rows = [carrier_row(number_type, number, results[(number_type, number)]) for number_type, number in numbers]
+    verified = sum(row['status'] == 'verified' for row in rows)
+    summary = f"Checked {total} carriers in {time.monotonic() - started:.0f}s: {verified} verified, {total - verified} not verified."
+    logger.info(f"Bulk lookup: {summary}")
+    await edit_progress(progress_message, summary)
+
+    if total <= BULK_LOOKUP_TABLE_ROWS:
+        await update.message.reply_text(format_lookup_table(rows), parse_mode='HTML')
+    else:
+        await update.message.reply_document(
+            document=format_lookup_csv(rows),
+            filename='carrier_lookup.csv',
+            caption=summary
+        )
+
+async def start_bulk_lookup(update: Update, context: CallbackContext, numbers: list) -> int:
+    """Kick off a bulk lookup in the background so the chat stays responsive and /cancel can stop it."""
+    if len(numbers) > BULK_LOOKUP_MAX_NUMBERS:
+        await update.message.reply_text(
+            f"Please send at most {BULK_LOOKUP_MAX_NUMBERS} numbers at a time ({len(numbers)} received)."
+        )
+        return LOOKUP_NUMBER
+
+    cancel_inflight(context)
+    progress_message = await update.message.reply_text(f"Looking up {len(numbers)} carriers...")
+    run_in_background(context, run_bulk_lookup(update, progress_message, numbers), update=update)
+    return ConversationHandler.END
 
 async def lookup_start(update: Update, context: CallbackContext) -> int:
     """Initiate the lookup process by asking for an MC or DOT number."""
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
     await update.message.reply_text(
-        "Please provide the MC or DOT number (e.g., 'MC 123456' or 'DOT 654321')."
+        "Please provide the MC or DOT number (e.g., 'MC 123456' or 'DOT 654321'). "
+        "To check several carriers, send one number per line or upload a CSV file."
     )
     return LOOKUP_NUMBER
 
@@ -18,39 +210,21 @@ async def lookup_process(update: Update, context: CallbackContext) -> int:
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
 
     # Process the user input without requiring a command prefix
-    user_input = update.message.text.strip().split()
-    if len(user_input) != 2:
+    numbers = parse_lookup_numbers(update.message.text)
+    if not numbers:
         await update.message.reply_text(
             "Please provide a valid number in the format: 'MC 123456' or 'DOT 654321'."
         )
         return LOOKUP_NUMBER
+    if len(numbers) > 1:
+        return await start_bulk_lookup(update, context, numbers)
 
-    number_type, number = user_input
+    number_type, number = numbers[0]
 
-    response = await verify_number(number_type.upper(), number.strip(), context, update)
+    response = await verify_number(number_type, number, context, update)
 
     if response['status'] == 'verified':
-        company_data = response['data']
-        safety_rating = company_data.get('safetyRating', 'No safety rating available')
-        company_name = company_data.get('carrier', {}).get('legalName') or company_data.get('carrier', {}).get('dbaName', 'Unknown Company')
-        drivers = company_data.get('carrier', {}).get('drivers', 'N/A')
-        inspections = company_data.get('inspections', {}).get('totalInspections', 'N/A')
-        insurance = company_data.get('insurance', 'No insurance data available')
-        operation_type = company_data.get('operationType', 'Unknown Operation Type')
-        address = company_data.get('carrier', {}).get('address', 'No address available')
-        allowed_to_operate = company_data.get('carrier', {}).get('allowedToOperate', 'Unknown')
-
-        await update.message.reply_text(
-            f"**Carrier Information**\n"
-            f"Legal Name: {company_name}\n"
-            f"DOT Number: {number.strip()}\n"
-            f"Allowed to Operate: {allowed_to_operate}\n"
-            f"Operation Type: {operation_type}\n"
-            f"Total Drivers: {drivers}\n"
-            f"Total Inspections: {inspections}\n"
-            f"Insurance: {insurance}\n"
-            f"Physical Address: {address}\n"
-        )
+        await update.message.reply_text(format_carrier_details(response['data']))
         await update.message.reply_text(
             "Thanks for using HiveEngine Rate Bot! Send another MC or DOT number to perform another lookup or '/rate' to request a rate quote."
         )
@@ -59,7 +233,27 @@ async def lookup_process(update: Update, context: CallbackContext) -> int:
 
     return ConversationHandler.END
 
+async def lookup_document(update: Update, context: CallbackContext) -> int:
+    """Run a bulk lookup over the MC/DOT numbers in an uploaded CSV file."""
+    document = update.message.document
+    if document.file_size and document.file_size > MAX_LOOKUP_FILE_BYTES:
+        await update.message.reply_text("That file is too large. Please upload a CSV under 1 MB.")
+        return LOOKUP_NUMBER
+
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action='typing')
+    telegram_file = await document.get_file()
+    numbers = parse_lookup_csv(bytes(await telegram_file.download_as_bytearray()))
+    if not numbers:
+        await update.message.reply_text(
+            "I couldn't find any MC or DOT numbers in that file. "
+            "Use a 'DOT' or 'MC' column, or values like 'MC 123456'."
+        )
+        return LOOKUP_NUMBER
+
+    return await start_bulk_lookup(update, context, numbers)
+
 async def cancel_lookup(update: Update, context: CallbackContext) -> int:
     """Cancel the lookup operation."""
+    cancel_inflight(context)
     await update.message.reply_text("Lookup operation has been canceled.", reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
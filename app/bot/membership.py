@@ -0,0 +1,94 @@
+import asyncio
+from telegram import Update
+from telegram.ext import CallbackContext
+from app.cache import TTLCache
+from app.config import (
+    MEMBERSHIP_CHANNEL_ID,
+    MEMBERSHIP_CACHE_TTL,
+    MEMBERSHIP_ACTIVE_SECONDS,
+    MEMBERSHIP_REFRESH_BATCH,
+    MEMBERSHIP_CACHE_SIZE,
+    logger
+)
+from app.db.sessions import end_session
+from app import metrics
+
+MEMBER_STATUSES = ('member', 'administrator', 'creator')
+# Pause between refresh batches to stay well inside Telegram's rate limits
+REFRESH_BATCH_PAUSE = 1.0
+
+# Telegram user id -> is a channel member
+_members = TTLCache(maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_CACHE_TTL)
+# Users who checked membership recently; only they are kept warm by the refresh job
+_active = TTLCache(maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_ACTIVE_SECONDS)
+metrics.register_cache('memberships', _members)
+
+
+async def _fetch_membership(bot, user_id) -> bool:
+    """Ask Telegram whether the user is in the channel; raises on API errors."""
+    member = await bot.get_chat_member(chat_id=MEMBERSHIP_CHANNEL_ID, user_id=user_id)
+    return member.status in MEMBER_STATUSES
+
+
+async def _record(user_id, is_member: bool) -> bool:
+    """Cache the answer and return True if it differs from the cached one."""
+    previous = _members.get(user_id)
+    _members.set(user_id, is_member)
+    if not is_member and previous is not False:
+        await end_session(user_id)  # A user who left the channel must verify again
+    return previous != is_member
+
+
+def track_active(user_id):
+    """Keep the user's membership (and so their verified session) checked by the refresh job."""
+    _active.set(user_id, True)
+
+
+async def check_membership(update: Update, context: CallbackContext) -> bool:
+    """Check if the user is a member of the required Telegram channel, using the cached answer when there is one."""
+    user_id = update.effective_user.id
+    track_active(user_id)
+
+    is_member = _members.get(user_id)
+    if is_member is not None:
+        return is_member
+
+    try:
+        is_member = await _fetch_membership(context.bot, user_id)
+    except Exception as e:
+        logger.error(f"Error checking membership: {e}")
+        return False
+    await _record(user_id, is_member)
+    return is_member
+
+
+async def refresh_memberships(context: CallbackContext) -> None:
+    """Re-check recently active users in batches so their cached membership never goes stale."""
+    user_ids = _active.keys()
+    changed = 0
+    for start in range(0, len(user_ids), MEMBERSHIP_REFRESH_BATCH):
+        batch = user_ids[start:start + MEMBERSHIP_REFRESH_BATCH]
+        results = await asyncio.gather(
+            *(_fetch_membership(context.bot, user_id) for user_id in batch),
+            return_exceptions=True
+        )
+        for user_id, is_member in zip(batch, results):
+            if isinstance(is_member, Exception):
+                logger.warning(f"Membership refresh failed for user {user_id}: {is_member}")
+                continue
+            changed += await _record(user_id, is_member)
+        if start + MEMBERSHIP_REFRESH_BATCH < len(user_ids):
+            await asyncio.sleep(REFRESH_BATCH_PAUSE)
+    metrics.increment('memberships.refreshed', len(user_ids))
+    logger.info(f"Refreshed membership of {len(user_ids)} active users ({changed} changed)")
+
+
+async def membership_changed(update: Update, context: CallbackContext) -> None:
+    """Update the cache from a chat_member update (sent when the bot is an admin of the channel)."""
+    change = update.chat_member
+    if str(change.chat.id) != str(MEMBERSHIP_CHANNEL_ID):
+        return
+    user_id = change.new_chat_member.user.id
+    is_member = change.new_chat_member.status in MEMBER_STATUSES
+    logger.info(f"Channel membership of user {user_id} changed to {change.new_chat_member.status}")
+    await _record(user_id, is_member)
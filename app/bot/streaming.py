@@ -0,0 +1,69 @@
+import asyncio
+import time
+from contextlib import aclosing
+from telegram.error import BadRequest, RetryAfter
+from app.config import STREAM_EDIT_INTERVAL, logger
+from app import metrics
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+PLACEHOLDER = "…"
+CURSOR = " ▌"
+
+
+class _StreamedMessage:
+    """A sent message whose edits are throttled to one per STREAM_EDIT_INTERVAL (or longer if Telegram asks)."""
+
+    def __init__(self, message):
+        self.message = message
+        self.shown = PLACEHOLDER
+        self.next_edit_at = 0.0  # The first content is shown as soon as it arrives
+
+    async def edit(self, text, final=False):
+        text = text[:MAX_MESSAGE_LENGTH]
+        if text == self.shown or (not final and time.monotonic() < self.next_edit_at):
+            return
+        try:
+            await self.message.edit_text(text)
+            self.shown = text
+            metrics.increment('streaming.edits')
+        except RetryAfter as e:
+            metrics.increment('streaming.rate_limited')
+            if final:
+                await asyncio.sleep(e.retry_after)
+                await self.edit(text, final=True)
+                return
+            self.next_edit_at = time.monotonic() + e.retry_after
+            return
+        except BadRequest as e:  # e.g. "message is not modified"
+            logger.debug(f"Skipped streaming edit: {e}")
+        self.next_edit_at = time.monotonic() + STREAM_EDIT_INTERVAL
+
+
+async def stream_reply(message, chunks, fallback: str) -> str:
+    """Reply to message with a placeholder and edit it as text arrives from the async iterator chunks.
+
+    Intermediate edits are throttled and show a cursor; the final edit holds
+    the complete text, or fallback if the stream failed before producing any.
+    Returns the final text.
+    """
+    started = time.monotonic()
+    streamed = _StreamedMessage(await message.reply_text(PLACEHOLDER))
+    text = ''
+    try:
+        async with aclosing(chunks):
+            async for piece in chunks:
+                if not text:
+                    metrics.observe('streaming.first_content_seconds', time.monotonic() - started)
+                text += piece
+                await streamed.edit(text.lstrip() + CURSOR)
+    except asyncio.CancelledError:
+        await streamed.edit((text.strip() + "\n\n(cancelled)").strip(), final=True)
+        raise
+    except Exception as e:
+        logger.error(f"Streaming reply failed after {len(text)} characters: {e!r}")
+
+    text = text.strip() or fallback
+    await streamed.edit(text, final=True)
+    metrics.observe('streaming.total_seconds', time.monotonic() - started)
+    return text
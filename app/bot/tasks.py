@@ -0,0 +1,31 @@
+from telegram.ext import CallbackContext
+from app.config import logger
+
+# chat_data key holding the chat's unfinished background tasks
+INFLIGHT_TASKS = 'inflight_tasks'
+
+
+def run_in_background(context: CallbackContext, coroutine, update=None):
+    """Start coroutine as a task owned by the current chat.
+
+    The task is remembered until it finishes so that /cancel or a new request
+    from the same chat can stop it before it posts a stale answer.
+    """
+    task = context.application.create_task(coroutine, update=update)
+    tasks = context.chat_data.setdefault(INFLIGHT_TASKS, set())
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+    return task
+
+
+def cancel_inflight(context: CallbackContext) -> int:
+    """Cancel the current chat's unfinished background tasks and return how many were cancelled."""
+    tasks = context.chat_data.get(INFLIGHT_TASKS) or set()
+    cancelled = 0
+    for task in list(tasks):
+        if not task.done():
+            task.cancel()
+            cancelled += 1
+    if cancelled:
+        logger.info(f"Cancelled {cancelled} in-flight tasks")
+    return cancelled
@@ -0,0 +1,142 @@
+import asyncio
+from telegram import Update
+from telegram.error import Forbidden
+from telegram.ext import CallbackContext
+from app.config import (
+    WATCHLIST_RECHECK_SECONDS,
+    WATCHLIST_BATCH_SIZE,
+    WATCHLIST_CONCURRENCY,
+    WATCHLIST_MAX_PER_CHAT,
+    logger
+)
+from app.api.carrier_cache import cache_key, put_carrier
+from app.api.fmcsa_lookup import recheck_carrier
+from app.bot.lookup import parse_lookup_numbers
+from app.bot.membership import check_membership
+from app.bot.utils import verify_number
+from app.db.mongo import run_db
+from app.db.watchlist import (
+    snapshot_of,
+    diff_snapshots,
+    watch,
+    unwatch,
+    watched_by,
+    due_for_recheck,
+    record_check
+)
+from app import metrics
+
+WATCH_USAGE = "Usage: /watch MC 123456 (several numbers are fine). /unwatch removes a carrier, /watchlist shows yours."
+
+
+def format_changes(entry, snapshot, changes):
+    name = snapshot.get('legal_name') or entry['snapshot'].get('legal_name') or 'Unknown Company'
+    lines = [f"Watchlist update for {name} ({entry['numberType']} {entry['number']}):"]
+    lines.extend(f"- {label}: {old or 'none'} -> {new or 'none'}" for label, old, new in changes)
+    return '\n'.join(lines)
+
+
+async def watch_command(update: Update, context: CallbackContext):
+    """Subscribe the chat to changes in the operating authority or safety rating of the given carriers."""
+    if not await check_membership(update, context):
+        await update.message.reply_text('Sorry, this bot is only for members of our private channel.')
+        return
+    numbers = parse_lookup_numbers(' '.join(context.args or []))
+    if not numbers:
+        await update.message.reply_text(WATCH_USAGE)
+        return
+
+    chat_id = update.effective_chat.id
+    watched = {entry['_id'] for entry in await run_db(watched_by, chat_id)}
+    replies = []
+    for number_type, number in numbers:
+        key = cache_key(number_type, number)
+        # Carriers already on the list don't count again, and numbers that fail verification never count
+        if key not in watched and len(watched) >= WATCHLIST_MAX_PER_CHAT:
+            replies.append(f"{number_type} {number}: not added, a chat can watch at most {WATCHLIST_MAX_PER_CHAT} carriers.")
+            continue
+        response = await verify_number(number_type, number, context, update)
+        if response['status'] != 'verified':
+            replies.append(f"{number_type} {number}: {response['message']}")
+            continue
+        await run_db(watch, key, number_type, number, chat_id, snapshot_of(response))
+        watched.add(key)
+        replies.append(f"{number_type} {number}: watching {response['data'].name}.")
+    if watched:
+        replies.append("I'll message this chat if a watched carrier's operating authority or safety rating changes.")
+    await update.message.reply_text('\n'.join(replies))
+
+
+async def unwatch_command(update: Update, context: CallbackContext):
+    """Unsubscribe the chat from the given carriers."""
+    numbers = parse_lookup_numbers(' '.join(context.args or []))
+    if not numbers:
+        await update.message.reply_text(WATCH_USAGE)
+        return
+    replies = []
+    for number_type, number in numbers:
+        removed = await run_db(unwatch, cache_key(number_type, number), update.effective_chat.id)
+        replies.append(f"{number_type} {number}: {'no longer watched' if removed else 'was not on your watchlist'}.")
+    await update.message.reply_text('\n'.join(replies))
+
+
+async def watchlist_command(update: Update, context: CallbackContext):
+    """List the carriers the chat is watching."""
+    entries = await run_db(watched_by, update.effective_chat.id)
+    if not entries:
+        await update.message.reply_text("Your watchlist is empty. " + WATCH_USAGE)
+        return
+    lines = [
+        f"{entry['numberType']} {entry['number']}: {entry['snapshot'].get('legal_name') or 'Unknown Company'} "
+        f"(allowed to operate: {entry['snapshot'].get('allowed_to_operate') or 'unknown'})"
+        for entry in entries
+    ]
+    await update.message.reply_text('\n'.join(lines))
+
+
+async def _notify(context: CallbackContext, entry, text):
+    for chat_id in entry['subscribers']:
+        try:
+            await context.bot.send_message(chat_id=chat_id, text=text)
+        except Forbidden:
+            # The bot was blocked or removed from the chat; stop watching for it
+            await run_db(unwatch, entry['_id'], chat_id)
+        except Exception as e:
+            logger.error(f"Watchlist notification to chat {chat_id} failed: {e}")
+
+
+async def _recheck(context: CallbackContext, entry, slots) -> bool:
+    """Re-fetch one watched carrier, store its snapshot and notify subscribers of changes. Returns True on a change."""
+    async with slots:
+        result, etag = await recheck_carrier(entry['numberType'], entry['number'], entry.get('etag'))
+    if result is None:  # 304 Not Modified
+        await run_db(record_check, entry['_id'], entry['snapshot'], etag)
+        metrics.increment('watchlist.not_modified')
+        return False
+    if result['status'] == 'error':
+        return False  # Left due, so the next run tries again
+
+    await put_carrier(entry['numberType'], entry['number'], result)
+    snapshot = snapshot_of(result)
+    changes = diff_snapshots(entry['snapshot'], snapshot)
+    await run_db(record_check, entry['_id'], snapshot, etag)
+    if changes:
+        logger.info(f"Watched carrier {entry['_id']} changed: {changes}")
+        await _notify(context, entry, format_changes(entry, snapshot, changes))
+    return bool(changes)
+
+
+async def recheck_watchlist(context: CallbackContext) -> None:
+    """JobQueue job: re-verify watched carriers that are due, WATCHLIST_CONCURRENCY at a time."""
+    entries = await run_db(due_for_recheck, WATCHLIST_RECHECK_SECONDS, WATCHLIST_BATCH_SIZE)
+    if not entries:
+        return
+    slots = asyncio.Semaphore(WATCHLIST_CONCURRENCY)
+    results = await asyncio.gather(*(_recheck(context, entry, slots) for entry in entries), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, Exception)]
+    changed = sum(result is True for result in results)
+    for failure in failures:
+        logger.error(f"Watchlist re-check failed: {failure!r}")
+    metrics.increment('watchlist.rechecked', len(entries))
+    metrics.increment('watchlist.changed', changed)
+    logger.info(f"Re-checked {len(entries)} watched carriers: {changed} changed, {len(failures)} failed")
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a time-to-live.
+
+    Safe to share between the event loop and the database executor threads.
+    Hit, miss and eviction counters are kept for metrics.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > self._clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, evicting the least recently used entries when full."""
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single key. Returns True if it was cached."""
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def invalidate_where(self, predicate):
+        """Drop every key for which predicate(key) is true and return how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def keys(self):
+        """Return a snapshot of the unexpired keys, least recently used first."""
+        with self._lock:
+            now = self._clock()
+            return [key for key, (expires_at, _) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and entry[0] > self._clock()
+
+    def stats(self):
+        """Return the counters and current size as a dict."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hitRate': self.hits / lookups if lookups else 0.0
+        }
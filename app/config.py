@@ -28,3 +28,130 @@ logger = logging.getLogger(__name__)
 EQUIPMENT_TYPE_MULTIPLIERS = {
     'V': 1, 'PO': 1, 'FO': 0.8, 'R': 1.2, 'VM': 1.7, 'RM': 2.2, 'F': 0.8, 'FM': 1.5
 }
+
+# Historical rate window used by the quote engine
+RATE_DISTANCE_TOLERANCE = 60
+RATE_WEIGHT_TOLERANCE = 3500
+
+# Source for historical rates: 'lane_stats' (pre-aggregated) or 'aggregate' (raw hive-cx-data pipeline)
+RATE_SOURCE = os.environ.get('RATE_SOURCE', 'lane_stats')
+
+# Bucket sizes for the pre-aggregated lane_stats collection
+LANE_STATS_DISTANCE_BUCKET = int(os.environ.get('LANE_STATS_DISTANCE_BUCKET', 20))
+LANE_STATS_WEIGHT_BUCKET = int(os.environ.get('LANE_STATS_WEIGHT_BUCKET', 500))
+
+# MongoDB connection pool; one client is shared by the whole process
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 120000))
+MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primaryPreferred')
+# Threads available for blocking pymongo calls made from async handlers
+MONGO_EXECUTOR_WORKERS = int(os.environ.get('MONGO_EXECUTOR_WORKERS', 16))
+
+# Optional in-memory columnar index of the busiest lanes (requires numpy)
+LANE_INDEX_ENABLED = os.environ.get('LANE_INDEX_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+LANE_INDEX_MAX_MB = int(os.environ.get('LANE_INDEX_MAX_MB', 256))
+LANE_INDEX_REFRESH_SECONDS = int(os.environ.get('LANE_INDEX_REFRESH_SECONDS', 3600))
+# Summed-area grid cells for lanes held in the lane index
+LANE_GRID_DISTANCE_BIN = int(os.environ.get('LANE_GRID_DISTANCE_BIN', 10))
+LANE_GRID_WEIGHT_BIN = int(os.environ.get('LANE_GRID_WEIGHT_BIN', 500))
+LANE_GRID_MAX_CELLS = int(os.environ.get('LANE_GRID_MAX_CELLS', 20000))
+
+# Widening (distance, weight) tolerance rings tried when a lane is sparse, tightest first
+RATE_TOLERANCE_RINGS = (
+    (RATE_DISTANCE_TOLERANCE, RATE_WEIGHT_TOLERANCE),
+    (RATE_DISTANCE_TOLERANCE * 2, RATE_WEIGHT_TOLERANCE * 2),
+    (RATE_DISTANCE_TOLERANCE * 4, RATE_WEIGHT_TOLERANCE * 3),
+)
+# Samples a ring needs before its average is preferred over a tighter, sparser ring
+RATE_MIN_SAMPLES = int(os.environ.get('RATE_MIN_SAMPLES', 5))
+
+# Cache of finished rate quotes, keyed on normalized load criteria
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', 5000))
+QUOTE_CACHE_TTL = int(os.environ.get('QUOTE_CACHE_TTL', 900))
+
+# Seconds a historical rate lookup may run before the formula estimate is kept
+QUOTE_HISTORY_TIMEOUT = int(os.environ.get('QUOTE_HISTORY_TIMEOUT', 30))
+RATE_QUERY_MAX_TIME_MS = QUOTE_HISTORY_TIMEOUT * 1000
+
+# Shared outbound HTTP client (seconds / connection counts)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 50))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_MAX_KEEPALIVE_CONNECTIONS', 20))
+# Concurrent requests allowed against the FMCSA API
+FMCSA_MAX_CONCURRENCY = int(os.environ.get('FMCSA_MAX_CONCURRENCY', 8))
+
+# Outbound call resilience: consecutive failures that open a circuit breaker, seconds before it is probed again,
+# and jittered retry backoff (seconds) for calls that are retried
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RESET_SECONDS = float(os.environ.get('BREAKER_RESET_SECONDS', 30))
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY', 0.2))
+RETRY_MAX_DELAY = float(os.environ.get('RETRY_MAX_DELAY', 2))
+# Total seconds a carrier lookup may take across retries, attempts per lookup, and seconds before a
+# duplicate request is raced against a slow one (0 disables hedging)
+FMCSA_DEADLINE_SECONDS = float(os.environ.get('FMCSA_DEADLINE_SECONDS', 15))
+FMCSA_RETRY_ATTEMPTS = int(os.environ.get('FMCSA_RETRY_ATTEMPTS', 3))
+FMCSA_HEDGE_AFTER_SECONDS = float(os.environ.get('FMCSA_HEDGE_AFTER_SECONDS', 0))
+# Chat model, seconds allowed per OpenAI request, and completions in flight at once across all chats
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4')
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 20))
+OPENAI_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', 4))
+# Cache of GPT replies keyed on model, normalized prompt and parameters
+LLM_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE', 2000))
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 3600))
+# Stream GPT replies into the chat by editing a placeholder message, at most one edit per STREAM_EDIT_INTERVAL seconds
+GPT_STREAMING = os.environ.get('GPT_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+STREAM_EDIT_INTERVAL = float(os.environ.get('STREAM_EDIT_INTERVAL', 1.0))
+# Total seconds an OpenAI completion may take across retries, and attempts per completion
+OPENAI_DEADLINE_SECONDS = float(os.environ.get('OPENAI_DEADLINE_SECONDS', 30))
+OPENAI_RETRY_ATTEMPTS = int(os.environ.get('OPENAI_RETRY_ATTEMPTS', 2))
+# Conversational mode: prompt tokens sent per request (system prompt, summary and recent turns), tokens
+# allowed for the reply, and the size of the rolling summary that replaces turns dropped from the window
+CONVERSATION_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_TOKEN_BUDGET', 3000))
+CONVERSATION_REPLY_TOKENS = int(os.environ.get('CONVERSATION_REPLY_TOKENS', 400))
+CONVERSATION_SUMMARY_TOKENS = int(os.environ.get('CONVERSATION_SUMMARY_TOKENS', 300))
+
+# Carrier profile cache (seconds): fresh lifetimes for found/missing carriers, and how long stale entries may be served
+CARRIER_CACHE_SIZE = int(os.environ.get('CARRIER_CACHE_SIZE', 10000))
+CARRIER_CACHE_TTL = int(os.environ.get('CARRIER_CACHE_TTL', 24 * 3600))
+CARRIER_CACHE_NEGATIVE_TTL = int(os.environ.get('CARRIER_CACHE_NEGATIVE_TTL', 3600))
+CARRIER_CACHE_MAX_STALE = int(os.environ.get('CARRIER_CACHE_MAX_STALE', 7 * 24 * 3600))
+
+# Optional offline FMCSA census index (built with `python -m app.db.census`); empty disables it.
+# Snapshots older than CENSUS_MAX_AGE_DAYS are ignored in favour of the live API.
+CENSUS_DB_PATH = os.environ.get('CENSUS_DB_PATH', '')
+CENSUS_MAX_AGE_DAYS = int(os.environ.get('CENSUS_MAX_AGE_DAYS', 35))
+
+# Seconds a confirmed carrier + membership check is remembered per Telegram user, and users kept in memory
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 7 * 24 * 3600))
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+
+# Telegram channel users must belong to, how long a membership answer is cached (seconds), how long after
+# their last /start a user's membership keeps being refreshed, and how often/how many users per batch
+MEMBERSHIP_CHANNEL_ID = os.environ.get('MEMBERSHIP_CHANNEL_ID', '-1001420252334')
+MEMBERSHIP_CACHE_TTL = int(os.environ.get('MEMBERSHIP_CACHE_TTL', 6 * 3600))
+MEMBERSHIP_ACTIVE_SECONDS = int(os.environ.get('MEMBERSHIP_ACTIVE_SECONDS', 7 * 24 * 3600))
+MEMBERSHIP_REFRESH_SECONDS = int(os.environ.get('MEMBERSHIP_REFRESH_SECONDS', 3600))
+MEMBERSHIP_REFRESH_BATCH = int(os.environ.get('MEMBERSHIP_REFRESH_BATCH', 20))
+MEMBERSHIP_CACHE_SIZE = int(os.environ.get('MEMBERSHIP_CACHE_SIZE', 50000))
+
+# Bulk /lookup: most numbers accepted per request, lookups run at once, seconds between progress edits,
+# and the largest result still sent as a table rather than a CSV document
+BULK_LOOKUP_MAX_NUMBERS = int(os.environ.get('BULK_LOOKUP_MAX_NUMBERS', 500))
+BULK_LOOKUP_CONCURRENCY = int(os.environ.get('BULK_LOOKUP_CONCURRENCY', 8))
+BULK_LOOKUP_PROGRESS_SECONDS = float(os.environ.get('BULK_LOOKUP_PROGRESS_SECONDS', 2))
+BULK_LOOKUP_TABLE_ROWS = int(os.environ.get('BULK_LOOKUP_TABLE_ROWS', 20))
+
+# Carrier watchlist: seconds between re-checks of each watched carrier, how often the job looks for due
+# carriers, how many it re-checks per run and at once, and how many carriers one chat may watch
+WATCHLIST_RECHECK_SECONDS = int(os.environ.get('WATCHLIST_RECHECK_SECONDS', 6 * 3600))
+WATCHLIST_JOB_SECONDS = int(os.environ.get('WATCHLIST_JOB_SECONDS', 900))
+WATCHLIST_BATCH_SIZE = int(os.environ.get('WATCHLIST_BATCH_SIZE', 200))
+WATCHLIST_CONCURRENCY = int(os.environ.get('WATCHLIST_CONCURRENCY', 4))
+WATCHLIST_MAX_PER_CHAT = int(os.environ.get('WATCHLIST_MAX_PER_CHAT', 100))
+
+# How often the metrics snapshot is written to the log
+METRICS_LOG_SECONDS = int(os.environ.get('METRICS_LOG_SECONDS', 300))
@@ -0,0 +1,219 @@
+"""Offline carrier index built from the FMCSA company census bulk file.
+
+The census CSV (one row per USDOT number, with up to three docket numbers)
+is loaded into a SQLite file keyed by DOT number and by docket prefix/number:
+
+    python -m app.db.census FMCSA_CENSUS.csv carriers.sqlite3 [--snapshot-date 2024-05-01]
+
+The file is written next to the target and moved into place, so a running
+bot picks up a rebuilt index on its next lookup.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from app.api.carrier_summary import CarrierSummary, intern_summary
+
+SCHEMA = """
+CREATE TABLE carriers (
+    dot_number INTEGER PRIMARY KEY,
+    legal_name TEXT,
+    dba_name TEXT,
+    status_code TEXT,
+    street TEXT,
+    city TEXT,
+    state TEXT,
+    zip TEXT,
+    power_units INTEGER,
+    drivers INTEGER
+);
+CREATE TABLE dockets (
+    prefix TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    dot_number INTEGER NOT NULL,
+    PRIMARY KEY (prefix, number)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+CARRIER_COLUMNS = (
+    'legal_name', 'dba_name', 'status_code', 'street', 'city', 'state', 'zip', 'power_units', 'drivers'
+)
+# Census header -> carriers column
+CENSUS_FIELDS = {
+    'LEGAL_NAME': 'legal_name',
+    'DBA_NAME': 'dba_name',
+    'STATUS_CODE': 'status_code',
+    'PHY_STREET': 'street',
+    'PHY_CITY': 'city',
+    'PHY_STATE': 'state',
+    'PHY_ZIP': 'zip',
+    'NBR_POWER_UNIT': 'power_units',
+    'DRIVER_TOTAL': 'drivers',
+}
+BATCH_SIZE = 10000
+
+
+def _to_int(value):
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def _census_rows(csv_file):
+    """Yield (dot_number, carrier values, [(docket prefix, docket number)]) for each census row."""
+    reader = csv.DictReader(csv_file)
+    reader.fieldnames = [name.strip().upper() for name in reader.fieldnames or []]
+    for row in reader:
+        dot_number = _to_int(row.get('DOT_NUMBER'))
+        if dot_number is None:
+            continue
+        values = {column: (row.get(field) or '').strip() or None for field, column in CENSUS_FIELDS.items()}
+        values['power_units'] = _to_int(values['power_units'])
+        values['drivers'] = _to_int(values['drivers'])
+        dockets = []
+        for slot in (1, 2, 3):
+            number = _to_int(row.get(f'DOCKET{slot}'))
+            if number is not None:
+                dockets.append(((row.get(f'DOCKET{slot}PREFIX') or 'MC').strip().upper(), number))
+        yield dot_number, [values[column] for column in CARRIER_COLUMNS], dockets
+
+
+def build_census_index(csv_path, db_path, snapshot_time=None):
+    """Build the SQLite index at db_path from a census CSV and return the number of carriers loaded.
+
+    snapshot_time (a Unix timestamp) records when FMCSA produced the file and
+    defaults to the CSV's modification time.
+    """
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+        carriers = []
+        dockets = []
+        loaded = 0
+        with open(csv_path, newline='', encoding='utf-8-sig', errors='replace') as csv_file:
+            for dot_number, values, row_dockets in _census_rows(csv_file):
+                carriers.append([dot_number] + values)
+                dockets.extend((prefix, number, dot_number) for prefix, number in row_dockets)
+                if len(carriers) >= BATCH_SIZE:
+                    loaded += _write_batch(connection, carriers, dockets)
+        loaded += _write_batch(connection, carriers, dockets)
+
+        snapshot_time = snapshot_time or os.path.getmtime(csv_path)
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [('snapshot_time', str(snapshot_time)), ('source', os.path.basename(csv_path)), ('carriers', str(loaded))]
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(tmp_path, db_path)
+    return loaded
+
+
+def _write_batch(connection, carriers, dockets):
+    placeholders = ', '.join('?' * (len(CARRIER_COLUMNS) + 1))
+    connection.executemany(f"INSERT OR REPLACE INTO carriers VALUES ({placeholders})", carriers)
+    connection.executemany("INSERT OR REPLACE INTO dockets VALUES (?, ?, ?)", dockets)
+    written = len(carriers)
+    carriers.clear()
+    dockets.clear()
+    return written
+
+
+class CensusIndex:
+    """Read-only lookups against a census SQLite file, reopened when the file is rebuilt.
+
+    lookup() returns the same result dict as the live FMCSA lookups for
+    carriers with an active USDOT status, and None for unknown or inactive
+    carriers or when the snapshot is older than max_age seconds, so callers
+    fall back to the live API in exactly the cases the snapshot can't settle.
+    """
+
+    def __init__(self, path, max_age):
+        self.path = path
+        self.max_age = max_age
+        self._connection = None
+        self._mtime = None
+        self._snapshot_time = 0.0
+
+    def _open(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+        if mtime != self._mtime:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'snapshot_time'").fetchone()
+            self._snapshot_time = float(row['value']) if row else 0.0
+            self._mtime = mtime
+        return self._connection
+
+    def is_fresh(self):
+        return self._open() is not None and time.time() - self._snapshot_time <= self.max_age
+
+    def find(self, number_type, number):
+        """Return the carriers row for a DOT or MC number, or None."""
+        connection = self._open()
+        number = _to_int(str(number))
+        if connection is None or number is None:
+            return None
+        if number_type == 'DOT':
+            return connection.execute("SELECT * FROM carriers WHERE dot_number = ?", (number,)).fetchone()
+        return connection.execute(
+            "SELECT carriers.* FROM dockets JOIN carriers USING (dot_number) WHERE prefix = ? AND number = ?",
+            (number_type, number)
+        ).fetchone()
+
+    def lookup(self, number_type, number):
+        if not self.is_fresh():
+            return None
+        row = self.find(number_type, number)
+        if row is None or row['status_code'] != 'A':
+            return None
+        address = ', '.join(part for part in (row['street'], row['city'], row['state'], row['zip']) if part) or None
+        summary = intern_summary(CarrierSummary(
+            legal_name=row['legal_name'],
+            dba_name=row['dba_name'],
+            dot_number=str(row['dot_number']),
+            mc_number=str(_to_int(str(number))) if number_type == 'MC' else None,
+            # An active USDOT registration says nothing about operating authority, which only the live API reports
+            allowed_to_operate=None,
+            drivers=row['drivers'],
+            address=address
+        ))
+        return {'status': 'verified', 'message': 'MC/DOT number verified.', 'data': summary}
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._mtime = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_path')
+    parser.add_argument('db_path')
+    parser.add_argument('--snapshot-date', help="Date FMCSA produced the file (YYYY-MM-DD); defaults to the file's mtime")
+    args = parser.parse_args()
+
+    snapshot_time = None
+    if args.snapshot_date:
+        snapshot_time = datetime.strptime(args.snapshot_date, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    started = time.perf_counter()
+    loaded = build_census_index(args.csv_path, args.db_path, snapshot_time)
+    print(f"Indexed {loaded} carriers into {args.db_path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
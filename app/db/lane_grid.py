@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def _summed_area(table):
+    """Return the summed-area table of a 2D array, padded with a leading zero row and column."""
+    padded = np.zeros((table.shape[0] + 1, table.shape[1] + 1), dtype=table.dtype)
+    padded[1:, 1:] = table.cumsum(axis=0).cumsum(axis=1)
+    return padded
+
+
+class LaneGrid:
+    """Distance x weight grid of one lane's loads with prefix sums for O(1) window queries.
+
+    Each cell holds the loads whose distance and weight fall in one
+    `distance_bin` x `weight_bin` rectangle. A tolerance window is answered
+    from four lookups per table, rounded outwards to whole cells.
+    """
+
+    __slots__ = ('distance_bin', 'weight_bin', 'distance_origin', 'weight_origin',
+                 'count', 'rate_sum', 'rate_sum_sq')
+
+    def __init__(self, distance, weight, rate, distance_bin, weight_bin):
+        distance_idx = np.floor(np.asarray(distance, dtype=np.float64) / distance_bin).astype(np.int64)
+        weight_idx = np.floor(np.asarray(weight, dtype=np.float64) / weight_bin).astype(np.int64)
+        rate = np.asarray(rate, dtype=np.float64)
+
+        self.distance_bin = distance_bin
+        self.weight_bin = weight_bin
+        self.distance_origin = int(distance_idx.min())
+        self.weight_origin = int(weight_idx.min())
+
+        distance_idx -= self.distance_origin
+        weight_idx -= self.weight_origin
+        shape = (int(distance_idx.max()) + 1, int(weight_idx.max()) + 1)
+        flat = distance_idx * shape[1] + weight_idx
+        cells = shape[0] * shape[1]
+
+        self.count = _summed_area(np.bincount(flat, minlength=cells).reshape(shape).astype(np.int64))
+        self.rate_sum = _summed_area(np.bincount(flat, weights=rate, minlength=cells).reshape(shape))
+        self.rate_sum_sq = _summed_area(np.bincount(flat, weights=rate * rate, minlength=cells).reshape(shape))
+
+    @staticmethod
+    def cells_for(distance, weight, distance_bin, weight_bin):
+        """Return how many cells a grid over these loads would need."""
+        distance_span = int(np.floor(np.max(distance) / distance_bin) - np.floor(np.min(distance) / distance_bin)) + 1
+        weight_span = int(np.floor(np.max(weight) / weight_bin) - np.floor(np.min(weight) / weight_bin)) + 1
+        return distance_span * weight_span
+
+    @property
+    def nbytes(self):
+        return self.count.nbytes + self.rate_sum.nbytes + self.rate_sum_sq.nbytes
+
+    def _cell_range(self, value, tolerance, bin_size, origin, size):
+        """Return the inclusive cell range covering value +/- tolerance, or None if it misses the grid."""
+        low = int(np.floor((value - tolerance) / bin_size)) - origin
+        high = int(np.floor((value + tolerance) / bin_size)) - origin
+        if high < 0 or low >= size:
+            return None
+        return max(low, 0), min(high, size - 1)
+
+    def _rectangle(self, table, rows, cols):
+        (r0, r1), (c0, c1) = rows, cols
+        return table[r1 + 1, c1 + 1] - table[r0, c1 + 1] - table[r1 + 1, c0] + table[r0, c0]
+
+    def window(self, bill_distance, weight, distance_tolerance, weight_tolerance):
+        """Aggregate the loads in a distance/weight window in constant time.
+
+        Returns a dict with `averageRate`, `count` and `stdDev`, or None when
+        the window holds no loads.
+        """
+        rows = self._cell_range(bill_distance, distance_tolerance, self.distance_bin,
+                                self.distance_origin, self.count.shape[0] - 1)
+        cols = self._cell_range(weight, weight_tolerance, self.weight_bin,
+                                self.weight_origin, self.count.shape[1] - 1)
+        if rows is None or cols is None:
+            return None
+
+        count = int(self._rectangle(self.count, rows, cols))
+        if not count:
+            return None
+
+        average_rate = float(self._rectangle(self.rate_sum, rows, cols)) / count
+        variance = max(float(self._rectangle(self.rate_sum_sq, rows, cols)) / count - average_rate ** 2, 0.0)
+        return {'averageRate': average_rate, 'count': count, 'stdDev': variance ** 0.5}
@@ -0,0 +1,243 @@
+import sys
+import time
+from app.config import (
+    LANE_INDEX_MAX_MB,
+    LANE_GRID_DISTANCE_BIN,
+    LANE_GRID_WEIGHT_BIN,
+    LANE_GRID_MAX_CELLS,
+    logger
+)
+from app.db.mongo import hiveData
+from app.db.pipelines import select_ring
+from app.db.normalize import (
+    SHIPPER_CITY_KEY,
+    CONSIGNEE_CITY_KEY,
+    BILL_DISTANCE_NUM,
+    WEIGHT_NUM,
+    RATE_NUM,
+    EQUIPMENT_KEY,
+    city_key,
+    equipment_key
+)
+
+try:
+    import numpy as np
+    from app.db.lane_grid import LaneGrid
+except ImportError:  # numpy is only required when LANE_INDEX_ENABLED is set
+    np = None
+
+# float32 distance + float32 weight + float64 rate
+BYTES_PER_LOAD = 4 + 4 + 8
+# int64 count + float64 rate sum + float64 rate sum of squares
+BYTES_PER_GRID_CELL = 8 + 8 + 8
+# Lanes fetched per query by LaneIndex.refresh, bounding the Python lists held before conversion to arrays
+LANE_FETCH_BATCH = 200
+
+
+class LaneColumns:
+    """Column arrays for every historical load of one trailer type on one city pair, plus its prefix-sum grid."""
+
+    __slots__ = ('distance', 'weight', 'rate', 'grid')
+
+    def __init__(self, distance, weight, rate, with_grid=True):
+        self.distance = np.asarray(distance, dtype=np.float32)
+        self.weight = np.asarray(weight, dtype=np.float32)
+        self.rate = np.asarray(rate, dtype=np.float64)
+        self.grid = LaneGrid(self.distance, self.weight, self.rate,
+                             LANE_GRID_DISTANCE_BIN, LANE_GRID_WEIGHT_BIN) if with_grid else None
+
+    def __len__(self):
+        return len(self.rate)
+
+    @property
+    def nbytes(self):
+        grid_bytes = self.grid.nbytes if self.grid is not None else 0
+        return self.distance.nbytes + self.weight.nbytes + self.rate.nbytes + grid_bytes
+
+
+class LaneIndex:
+    """In-process columnar copy of hive-cx-data for the busiest lanes.
+
+    Lanes are keyed by an interned (shipper city, consignee city, trailer type) tuple and
+    loaded busiest-first until the memory budget is spent; lanes that did not
+    fit are reported as missing so callers can fall back to MongoDB. Lanes
+    whose distance/weight spread fits LANE_GRID_MAX_CELLS also get a
+    summed-area grid so unfiltered windows are answered in constant time.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lanes = {}  # Replaced whole on load
+        self.nbytes = 0
+        self.loaded_at = None
+
+    @staticmethod
+    def lane_key(shipper_city, consignee_city, equipment):
+        """Return the interned key for a city pair and trailer type."""
+        return (
+            sys.intern(city_key(shipper_city) or ''),
+            sys.intern(city_key(consignee_city) or ''),
+            sys.intern(equipment_key(equipment) or '')
+        )
+
+    def _collect(self, documents, rows, lanes_wanted=None):
+        """Append the usable documents to per-lane Python column lists in rows."""
+        for doc in documents:
+            distance = doc.get(BILL_DISTANCE_NUM)
+            weight = doc.get(WEIGHT_NUM)
+            rate = doc.get(RATE_NUM)
+            if distance is None or weight is None or rate is None:
+                continue
+            key = self.lane_key(doc.get(SHIPPER_CITY_KEY), doc.get(CONSIGNEE_CITY_KEY), doc.get(EQUIPMENT_KEY))
+            if lanes_wanted is not None and key not in lanes_wanted:
+                continue
+            columns = rows.setdefault(key, ([], [], []))
+            columns[0].append(distance)
+            columns[1].append(weight)
+            columns[2].append(rate)
+
+    def _build(self, rows, lanes, nbytes):
+        """Turn collected lanes into column arrays, busiest first, while they fit the budget.
+
+        Returns the new byte total and how many lanes did not fit.
+        """
+        skipped = 0
+        for key, columns in sorted(rows.items(), key=lambda item: len(item[1][2]), reverse=True):
+            size = len(columns[2]) * BYTES_PER_LOAD
+            cells = LaneGrid.cells_for(columns[0], columns[1], LANE_GRID_DISTANCE_BIN, LANE_GRID_WEIGHT_BIN)
+            with_grid = cells <= LANE_GRID_MAX_CELLS
+            if with_grid and nbytes + size + cells * BYTES_PER_GRID_CELL <= self.max_bytes:
+                size += cells * BYTES_PER_GRID_CELL
+            else:
+                with_grid = False  # Without its grid the lane may still fit; windows are then scanned
+            if nbytes + size > self.max_bytes:
+                skipped += 1
+                continue
+            lanes[key] = LaneColumns(*columns, with_grid=with_grid)
+            nbytes += size
+        return nbytes, skipped
+
+    def _swap(self, lanes, nbytes, skipped):
+        # Swap the new arrays in at once so readers never see a half-built index
+        self._lanes = lanes
+        self.nbytes = nbytes
+        self.loaded_at = time.time()
+        logger.info(f"Lane index loaded {len(lanes)} lanes ({nbytes / 2 ** 20:.1f} MB), {skipped} lanes over budget")
+        return len(lanes)
+
+    def load(self, documents):
+        """Replace the index contents with normalized hive-cx-data documents.
+
+        Every document is read before lanes are chosen, so this suits small or
+        already materialized inputs; refresh() keeps peak memory within the budget.
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for the in-memory lane index")
+        rows = {}
+        self._collect(documents, rows)
+        lanes = {}
+        nbytes, skipped = self._build(rows, lanes, 0)
+        return self._swap(lanes, nbytes, skipped)
+
+    def plan(self, lane_counts):
+        """Pick the busiest lanes whose loads fit the budget from (shipper key, consignee key, equipment key, count) rows."""
+        planned = []
+        nbytes = 0
+        for shipper_city, consignee_city, equipment, count in sorted(lane_counts, key=lambda row: row[3], reverse=True):
+            size = count * BYTES_PER_LOAD
+            if nbytes + size > self.max_bytes:
+                continue
+            planned.append((shipper_city, consignee_city, equipment))
+            nbytes += size
+        return planned
+
+    def refresh(self):
+        """Reload the index from hive-cx-data.
+
+        Per-lane load counts are aggregated on the server first, and only the
+        lanes that fit max_bytes are fetched, LANE_FETCH_BATCH lanes at a time,
+        so memory stays bounded by the budget rather than the collection size.
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for the in-memory lane index")
+        query = {
+            SHIPPER_CITY_KEY: {'$ne': None},
+            CONSIGNEE_CITY_KEY: {'$ne': None},
+            BILL_DISTANCE_NUM: {'$ne': None},
+            WEIGHT_NUM: {'$ne': None},
+            RATE_NUM: {'$ne': None}
+        }
+        counts = hiveData.aggregate([
+            {'$match': query},
+            {'$group': {
+                '_id': {'s': f'${SHIPPER_CITY_KEY}', 'c': f'${CONSIGNEE_CITY_KEY}', 'e': f'${EQUIPMENT_KEY}'},
+                'count': {'$sum': 1}
+            }}
+        ], allowDiskUse=True)
+        lane_counts = [(row['_id']['s'], row['_id']['c'], row['_id'].get('e'), row['count']) for row in counts]
+        planned = self.plan(lane_counts)
+
+        projection = {
+            '_id': 0,
+            SHIPPER_CITY_KEY: 1,
+            CONSIGNEE_CITY_KEY: 1,
+            BILL_DISTANCE_NUM: 1,
+            WEIGHT_NUM: 1,
+            RATE_NUM: 1,
+            EQUIPMENT_KEY: 1
+        }
+        lanes = {}
+        nbytes = 0
+        skipped = len(lane_counts) - len(planned)
+        for start in range(0, len(planned), LANE_FETCH_BATCH):
+            batch = planned[start:start + LANE_FETCH_BATCH]
+            batch_query = dict(query, **{'$or': [
+                {SHIPPER_CITY_KEY: shipper_city, CONSIGNEE_CITY_KEY: consignee_city, EQUIPMENT_KEY: equipment}
+                for shipper_city, consignee_city, equipment in batch
+            ]})
+            rows = {}
+            wanted = {self.lane_key(*lane) for lane in batch}
+            self._collect(hiveData.find(batch_query, projection, batch_size=10000), rows, wanted)
+            nbytes, batch_skipped = self._build(rows, lanes, nbytes)
+            skipped += batch_skipped
+        return self._swap(lanes, nbytes, skipped)
+
+    def has_lane(self, shipper_city, consignee_city, equipment):
+        """Return True if the lane's loads of this trailer type are held in memory."""
+        return self.lane_key(shipper_city, consignee_city, equipment) in self._lanes
+
+    def window(self, shipper_city, consignee_city, equipment, bill_distance, weight,
+               distance_tolerance, weight_tolerance):
+        """Average the loads in a distance/weight window.
+
+        Returns the same per-ring dict as app.db.lane_stats.fetch_lane_rings, or None
+        when no load on the lane falls inside the window.
+        """
+        columns = self._lanes.get(self.lane_key(shipper_city, consignee_city, equipment))
+        if columns is None:
+            return None
+        if columns.grid is not None:
+            return columns.grid.window(bill_distance, weight, distance_tolerance, weight_tolerance)
+
+        mask = (np.abs(columns.distance - bill_distance) <= distance_tolerance) & \
+               (np.abs(columns.weight - weight) <= weight_tolerance)
+
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return None
+
+        rates = columns.rate[mask]
+        return {'averageRate': float(rates.mean()), 'count': count, 'stdDev': float(rates.std())}
+
+    def widening_window(self, shipper_city, consignee_city, equipment, bill_distance, weight,
+                        rings, min_samples):
+        """Answer every tolerance ring and pick one with app.db.pipelines.select_ring."""
+        results = [
+            self.window(shipper_city, consignee_city, equipment, bill_distance, weight,
+                        distance_tolerance, weight_tolerance)
+            for distance_tolerance, weight_tolerance in rings
+        ]
+        return select_ring(results, rings, min_samples)
+
+
+lane_index = LaneIndex(max_bytes=LANE_INDEX_MAX_MB * 2 ** 20)
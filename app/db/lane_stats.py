@@ -0,0 +1,164 @@
+import math
+from pymongo import ASCENDING, errors
+from app.config import LANE_STATS_DISTANCE_BUCKET, LANE_STATS_WEIGHT_BUCKET, RATE_QUERY_MAX_TIME_MS, logger
+from app.db.mongo import db, notify_ingest
+from app.db.normalize import city_key, equipment_key, to_number_expression
+
+LANE_STATS_COLLECTION = 'lane_stats'
+SOURCE_COLLECTION = 'hive-cx-data'
+
+
+def distance_bucket(distance):
+    """Return the lane_stats distance bucket for a mileage."""
+    return int(math.floor(distance / LANE_STATS_DISTANCE_BUCKET))
+
+
+def weight_bucket(weight):
+    """Return the lane_stats weight bucket for a weight in lbs."""
+    return int(math.floor(weight / LANE_STATS_WEIGHT_BUCKET))
+
+
+def build_lane_stats_pipeline():
+    """Build the pipeline that rolls hive-cx-data up into lane_stats buckets."""
+    return [
+        {
+            '$match': {
+                'Shipper city': {'$exists': True, '$ne': None},
+                'Consignee city': {'$exists': True, '$ne': None},
+                'Bill Distance': {'$exists': True, '$ne': None},
+                'Weight': {'$exists': True, '$ne': None},
+                'Rate': {'$exists': True, '$ne': None}
+            }
+        },
+        {
+            '$addFields': {
+                'normalizedBillDistance': to_number_expression('$Bill Distance'),
+                'normalizedWeight': to_number_expression('$Weight'),
+                'normalizedRate': to_number_expression('$Rate')
+            }
+        },
+        {
+            '$match': {
+                'normalizedBillDistance': {'$ne': None},
+                'normalizedWeight': {'$ne': None},
+                'normalizedRate': {'$ne': None}
+            }
+        },
+        {
+            '$group': {
+                '_id': {
+                    'shipperCity': {'$toUpper': {'$trim': {'input': '$Shipper city'}}},
+                    'consigneeCity': {'$toUpper': {'$trim': {'input': '$Consignee city'}}},
+                    'equipment': {'$toUpper': {'$trim': {'input': {'$ifNull': ['$Trailer type', '']}}}},
+                    'distanceBucket': {'$floor': {'$divide': ['$normalizedBillDistance', LANE_STATS_DISTANCE_BUCKET]}},
+                    'weightBucket': {'$floor': {'$divide': ['$normalizedWeight', LANE_STATS_WEIGHT_BUCKET]}}
+                },
+                'count': {'$sum': 1},
+                'rateSum': {'$sum': '$normalizedRate'},
+                'rateSumSq': {'$sum': {'$multiply': ['$normalizedRate', '$normalizedRate']}}
+            }
+        },
+        {
+            '$project': {
+                '_id': 0,
+                'shipperCity': '$_id.shipperCity',
+                'consigneeCity': '$_id.consigneeCity',
+                'equipment': '$_id.equipment',
+                'distanceBucket': {'$toInt': '$_id.distanceBucket'},
+                'weightBucket': {'$toInt': '$_id.weightBucket'},
+                'count': 1,
+                'rateSum': 1,
+                'rateSumSq': 1
+            }
+        },
+        {'$out': LANE_STATS_COLLECTION}
+    ]
+
+
+def ensure_lane_stats_indexes():
+    """Create the index the quote path uses to read lane_stats buckets."""
+    db[LANE_STATS_COLLECTION].create_index(
+        [
+            ('shipperCity', ASCENDING),
+            ('consigneeCity', ASCENDING),
+            ('distanceBucket', ASCENDING),
+            ('weightBucket', ASCENDING),
+            ('equipment', ASCENDING)
+        ],
+        name='lane_window'
+    )
+
+
+def rebuild_lane_stats():
+    """Recompute the lane_stats collection from hive-cx-data.
+
+    `$out` swaps the new collection in atomically, so quotes keep reading the
+    previous statistics until the rebuild finishes.
+    """
+    logger.info("Rebuilding lane_stats from hive-cx-data")
+    try:
+        db[SOURCE_COLLECTION].aggregate(build_lane_stats_pipeline(), allowDiskUse=True)
+        ensure_lane_stats_indexes()
+    except errors.PyMongoError as e:
+        logger.error(f"An error occurred when rebuilding lane_stats: {e}")
+        raise
+    count = db[LANE_STATS_COLLECTION].estimated_document_count()
+    logger.info(f"lane_stats rebuilt with {count} buckets")
+    notify_ingest()
+    return count
+
+
+def fetch_lane_rings(shipper_city, consignee_city, equipment, bill_distance, weight, rings, comment=None):
+    """Combine the lane_stats buckets of one trailer type covering each tolerance ring.
+
+    `rings` is a sequence of (distance tolerance, weight tolerance) pairs. The
+    buckets for the widest ring are read in one indexed query and summed per
+    ring, giving one dict with `averageRate`, `count` and `stdDev` (or None
+    when the ring is empty) per ring. Buckets on a ring's edges are included
+    whole, so each ring is widened to the nearest bucket boundary.
+    """
+    ring_buckets = [
+        (
+            distance_bucket(bill_distance - distance_tolerance),
+            distance_bucket(bill_distance + distance_tolerance),
+            weight_bucket(weight - weight_tolerance),
+            weight_bucket(weight + weight_tolerance)
+        )
+        for distance_tolerance, weight_tolerance in rings
+    ]
+    query = {
+        'shipperCity': city_key(shipper_city),
+        'consigneeCity': city_key(consignee_city),
+        'equipment': equipment_key(equipment) or '',
+        'distanceBucket': {
+            '$gte': min(bounds[0] for bounds in ring_buckets),
+            '$lte': max(bounds[1] for bounds in ring_buckets)
+        },
+        'weightBucket': {
+            '$gte': min(bounds[2] for bounds in ring_buckets),
+            '$lte': max(bounds[3] for bounds in ring_buckets)
+        }
+    }
+
+    projection = {'_id': 0, 'distanceBucket': 1, 'weightBucket': 1, 'count': 1, 'rateSum': 1, 'rateSumSq': 1}
+    totals = [[0, 0.0, 0.0] for _ in rings]
+    for bucket in db[LANE_STATS_COLLECTION].find(query, projection, max_time_ms=RATE_QUERY_MAX_TIME_MS, comment=comment):
+        for total, (d_low, d_high, w_low, w_high) in zip(totals, ring_buckets):
+            if d_low <= bucket['distanceBucket'] <= d_high and w_low <= bucket['weightBucket'] <= w_high:
+                total[0] += bucket['count']
+                total[1] += bucket['rateSum']
+                total[2] += bucket['rateSumSq']
+
+    results = []
+    for count, rate_sum, rate_sum_sq in totals:
+        if not count:
+            results.append(None)
+            continue
+        average_rate = rate_sum / count
+        variance = max(rate_sum_sq / count - average_rate ** 2, 0.0)
+        results.append({'averageRate': average_rate, 'count': count, 'stdDev': math.sqrt(variance)})
+    return results
+
+
+if __name__ == '__main__':
+    rebuild_lane_stats()
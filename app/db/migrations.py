@@ -0,0 +1,67 @@
+from pymongo import ASCENDING, errors
+from app.config import logger
+from app.db.mongo import hiveData, notify_ingest
+from app.db.normalize import (
+    SHIPPER_CITY_KEY,
+    CONSIGNEE_CITY_KEY,
+    EQUIPMENT_KEY,
+    BILL_DISTANCE_NUM,
+    WEIGHT_NUM,
+    RATE_NUM,
+    NORMALIZED_VERSION,
+    NORMALIZATION_VERSION,
+    build_normalization_update
+)
+
+RATE_WINDOW_INDEX = 'lane_equipment_rate_window'
+# Replaced by RATE_WINDOW_INDEX once quotes started matching on equipment
+LEGACY_RATE_WINDOW_INDEX = 'lane_rate_window'
+
+
+def backfill_normalized_fields():
+    """Add typed distance/weight/rate fields and city keys to loads missing them."""
+    logger.info("Backfilling normalized fields on hive-cx-data")
+    try:
+        result = hiveData.update_many(
+            {NORMALIZED_VERSION: {'$ne': NORMALIZATION_VERSION}},
+            build_normalization_update()
+        )
+    except errors.PyMongoError as e:
+        logger.error(f"An error occurred when normalizing hive-cx-data: {e}")
+        raise
+    logger.info(f"Normalized {result.modified_count} loads")
+    if result.modified_count:
+        notify_ingest()
+    return result.modified_count
+
+
+def ensure_rate_window_index():
+    """Create the compound index that covers the rate window query.
+
+    Equality on the city and equipment keys comes first and the two range
+    fields follow, with the rate last so the average can be computed from the
+    index alone. The older index without equipment is dropped.
+    """
+    hiveData.create_index(
+        [
+            (SHIPPER_CITY_KEY, ASCENDING),
+            (CONSIGNEE_CITY_KEY, ASCENDING),
+            (EQUIPMENT_KEY, ASCENDING),
+            (BILL_DISTANCE_NUM, ASCENDING),
+            (WEIGHT_NUM, ASCENDING),
+            (RATE_NUM, ASCENDING)
+        ],
+        name=RATE_WINDOW_INDEX
+    )
+    if LEGACY_RATE_WINDOW_INDEX in hiveData.index_information():
+        hiveData.drop_index(LEGACY_RATE_WINDOW_INDEX)
+
+
+def migrate():
+    """Run the hive-cx-data normalization migration end to end."""
+    backfill_normalized_fields()
+    ensure_rate_window_index()
+
+
+if __name__ == '__main__':
+    migrate()
@@ -1,20 +1,99 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pymongo import MongoClient, errors
-from app.config import MONGO_CLIENT, logger
+from app.config import (
+    MONGO_CLIENT,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_READ_PREFERENCE,
+    MONGO_EXECUTOR_WORKERS,
+    logger
+)
+from app.db.normalize import normalize_load_document
 
-# Create the MongoClient and connect to the database
+# Create the shared MongoClient and connect to the database
 try:
-    client = MongoClient(MONGO_CLIENT)
+    client = MongoClient(
+        MONGO_CLIENT,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        readPreference=MONGO_READ_PREFERENCE,
+    )
     db = client.get_database('hivedb')
     hiveData = db['hive-cx-data']
 except errors.ConnectionError as e:
     logger.error(f"Could not connect to MongoDB: {e}")
     raise
 
+# Blocking pymongo calls made from handlers run here instead of on the event loop
+_executor = ThreadPoolExecutor(max_workers=MONGO_EXECUTOR_WORKERS, thread_name_prefix='mongo')
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call on the bounded executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+# Callbacks run after historical loads are written, e.g. to drop cached quotes
+_ingest_listeners = []
+
+def add_ingest_listener(callback):
+    """Register callback(document) to run after hive-cx-data changes; document is None for bulk changes."""
+    _ingest_listeners.append(callback)
+
+def notify_ingest(document=None):
+    """Tell the ingest listeners in this process that hive-cx-data has changed."""
+    for callback in _ingest_listeners:
+        try:
+            callback(document)
+        except Exception as e:
+            logger.error(f"Ingest listener {callback} failed: {e}")
+
+def kill_operations(comment):
+    """Kill the server operations tagged with `comment` and return how many were killed."""
+    killed = 0
+    try:
+        for op in client.admin.aggregate([{'$currentOp': {}}, {'$match': {'command.comment': comment}}]):
+            client.admin.command('killOp', op=op['opid'])
+            killed += 1
+    except errors.PyMongoError as e:
+        logger.warning(f"Could not kill operations tagged {comment}: {e}")
+    return killed
+
+async def run_db_cancellable(func, *args, **kwargs):
+    """Like run_db, but kill the query server-side if the awaiting task is cancelled.
+
+    `func` must accept a `comment` keyword and pass it to its queries so the
+    operation can be found again.
+    """
+    comment = f"hivebot-{uuid.uuid4().hex}"
+    try:
+        return await run_db(func, *args, comment=comment, **kwargs)
+    except asyncio.CancelledError:
+        _executor.submit(kill_operations, comment)
+        raise
+
+def close_client():
+    """Shut down the database executor and close the shared client."""
+    _executor.shutdown(wait=False, cancel_futures=True)
+    client.close()
+
 # Function to insert a document into a collection
 def insert_document(collection_name, document):
     try:
         collection = db[collection_name]
+        if collection_name == hiveData.name:
+            document = normalize_load_document(document)  # Keep typed lane fields in step with the raw ones
         result = collection.insert_one(document)
+        if collection_name == hiveData.name:
+            notify_ingest(document)
         return result.inserted_id  # Return the ID of the inserted document
     except errors.PyMongoError as e:
         logger.error(f"An error occurred when inserting the document: {e}")
@@ -28,3 +107,11 @@ def fetch_documents(collection_name, query):
     except errors.PyMongoError as e:
         logger.error(f"An error occurred when fetching documents: {e}")
         return []  # Return an empty list if an error occurred
+
+async def insert_document_async(collection_name, document):
+    """Insert a document without blocking the event loop."""
+    return await run_db(insert_document, collection_name, document)
+
+async def fetch_documents_async(collection_name, query):
+    """Fetch documents without blocking the event loop."""
+    return await run_db(fetch_documents, collection_name, query)
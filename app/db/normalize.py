@@ -0,0 +1,115 @@
+import re
+from bson.decimal128 import Decimal128
+
+# Typed fields added next to the raw hive-cx-data columns
+SHIPPER_CITY_KEY = 'shipperCityKey'
+CONSIGNEE_CITY_KEY = 'consigneeCityKey'
+EQUIPMENT_KEY = 'equipmentKey'
+BILL_DISTANCE_NUM = 'billDistanceNum'
+WEIGHT_NUM = 'weightNum'
+RATE_NUM = 'rateNum'
+NORMALIZED_VERSION = 'normalizedVersion'
+
+# Bump when the normalization rules change so the backfill revisits every load
+NORMALIZATION_VERSION = 3
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def city_key(city):
+    """Return the uppercased, trimmed key used to match a city."""
+    if not isinstance(city, str):
+        return None
+    return city.strip().upper() or None
+
+
+def equipment_key(trailer_type):
+    """Return the uppercased, trimmed trailer type code (e.g. 'V', 'R') used to match equipment."""
+    return city_key(trailer_type)
+
+
+def to_number(value):
+    """Coerce a raw distance/weight/rate value to a float, or None if it isn't numeric."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, str):
+        match = _NUMBER_PATTERN.search(value.replace(',', ''))
+        return float(match.group()) if match else None
+    return None
+
+
+def normalize_load_document(document):
+    """Add the typed lane fields to a hive-cx-data document in place and return it."""
+    document[SHIPPER_CITY_KEY] = city_key(document.get('Shipper city'))
+    document[CONSIGNEE_CITY_KEY] = city_key(document.get('Consignee city'))
+    document[EQUIPMENT_KEY] = equipment_key(document.get('Trailer type'))
+    document[BILL_DISTANCE_NUM] = to_number(document.get('Bill Distance'))
+    document[WEIGHT_NUM] = to_number(document.get('Weight'))
+    document[RATE_NUM] = to_number(document.get('Rate'))
+    document[NORMALIZED_VERSION] = NORMALIZATION_VERSION
+    return document
+
+
+def to_number_expression(field):
+    """Aggregation expression equivalent of to_number, for update and aggregation pipelines.
+
+    Strings are stripped of thousands separators and searched for a number,
+    numeric types are converted, and anything else (booleans, dates, objects)
+    becomes null, exactly as to_number does in Python.
+    """
+    return {
+        '$switch': {
+            'branches': [
+                {
+                    'case': {'$eq': [{'$type': field}, 'string']},
+                    'then': {
+                        '$let': {
+                            'vars': {
+                                'found': {
+                                    '$regexFind': {
+                                        'input': {'$replaceAll': {'input': field, 'find': ',', 'replacement': ''}},
+                                        'regex': _NUMBER_PATTERN.pattern
+                                    }
+                                }
+                            },
+                            'in': {'$convert': {'input': '$$found.match', 'to': 'double', 'onError': None, 'onNull': None}}
+                        }
+                    }
+                },
+                {'case': {'$isNumber': field}, 'then': {'$toDouble': field}}
+            ],
+            'default': None
+        }
+    }
+
+
+def _server_key(field):
+    """Server-side equivalent of city_key and equipment_key for update pipelines."""
+    return {
+        '$cond': {
+            'if': {'$eq': [{'$type': field}, 'string']},
+            'then': {'$toUpper': {'$trim': {'input': field}}},
+            'else': None
+        }
+    }
+
+
+def build_normalization_update():
+    """Build the update pipeline the backfill applies to existing loads."""
+    return [
+        {
+            '$set': {
+                SHIPPER_CITY_KEY: _server_key('$Shipper city'),
+                CONSIGNEE_CITY_KEY: _server_key('$Consignee city'),
+                EQUIPMENT_KEY: _server_key('$Trailer type'),
+                BILL_DISTANCE_NUM: to_number_expression('$Bill Distance'),
+                WEIGHT_NUM: to_number_expression('$Weight'),
+                RATE_NUM: to_number_expression('$Rate'),
+                NORMALIZED_VERSION: NORMALIZATION_VERSION
+            }
+        }
+    ]
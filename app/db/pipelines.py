@@ -0,0 +1,90 @@
+from app.db.normalize import (
+    SHIPPER_CITY_KEY,
+    CONSIGNEE_CITY_KEY,
+    EQUIPMENT_KEY,
+    BILL_DISTANCE_NUM,
+    WEIGHT_NUM,
+    RATE_NUM,
+    city_key,
+    equipment_key
+)
+
+
+def _window_match(bill_distance, weight, distance_tolerance, weight_tolerance):
+    return {
+        BILL_DISTANCE_NUM: {
+            '$gte': bill_distance - distance_tolerance,
+            '$lte': bill_distance + distance_tolerance
+        },
+        WEIGHT_NUM: {
+            '$gte': weight - weight_tolerance,
+            '$lte': weight + weight_tolerance
+        }
+    }
+
+
+def build_rate_window_pipeline(shipper_city, consignee_city, equipment, bill_distance, weight, rings):
+    """Build the hive-cx-data pipeline that averages every tolerance ring in one round trip.
+
+    Only loads with the same trailer type are averaged. `rings` is a sequence
+    of (distance tolerance, weight tolerance) pairs. The leading `$match` reads
+    the widest ring from the lane_equipment_rate_window index and
+    `$facet` produces one `ring<N>` bucket per ring with `averageRate` and
+    `count`; pass the result to select_ring.
+    """
+    widest_distance = max(distance for distance, _ in rings)
+    widest_weight = max(weight_tolerance for _, weight_tolerance in rings)
+
+    match = {
+        SHIPPER_CITY_KEY: city_key(shipper_city),
+        CONSIGNEE_CITY_KEY: city_key(consignee_city),
+        EQUIPMENT_KEY: equipment_key(equipment)
+    }
+    match.update(_window_match(bill_distance, weight, widest_distance, widest_weight))
+
+    facets = {}
+    for i, (distance_tolerance, weight_tolerance) in enumerate(rings):
+        facets[f'ring{i}'] = [
+            {'$match': _window_match(bill_distance, weight, distance_tolerance, weight_tolerance)},
+            {'$group': {'_id': None, 'averageRate': {'$avg': f'${RATE_NUM}'}, 'count': {'$sum': 1}}}
+        ]
+
+    return [
+        {'$match': match},
+        # Only indexed fields are kept so the scan stays covered by lane_equipment_rate_window
+        {'$project': {'_id': 0, BILL_DISTANCE_NUM: 1, WEIGHT_NUM: 1, RATE_NUM: 1}},
+        {'$facet': facets}
+    ]
+
+
+def facet_ring_results(facet_documents, rings):
+    """Unpack the output of build_rate_window_pipeline into one result (or None) per ring."""
+    facets = facet_documents[0] if facet_documents else {}
+    results = []
+    for i in range(len(rings)):
+        groups = facets.get(f'ring{i}') or []
+        if groups and groups[0].get('averageRate') is not None:
+            results.append({'averageRate': groups[0]['averageRate'], 'count': groups[0]['count']})
+        else:
+            results.append(None)
+    return results
+
+
+def select_ring(results, rings, min_samples):
+    """Pick the tightest ring with at least `min_samples` loads.
+
+    `results` holds one result dict (or None) per ring. When no ring reaches
+    `min_samples` the tightest non-empty ring is used. The chosen result is
+    annotated with `distanceTolerance` and `weightTolerance`; None means every
+    ring was empty.
+    """
+    fallback = None
+    for result, (distance_tolerance, weight_tolerance) in zip(results, rings):
+        if not result:
+            continue
+        result = dict(result, distanceTolerance=distance_tolerance, weightTolerance=weight_tolerance)
+        if result['count'] >= min_samples:
+            return result
+        if fallback is None:
+            fallback = result
+    return fallback
@@ -0,0 +1,107 @@
+import time
+from datetime import datetime, timezone
+from pymongo import ASCENDING, errors
+from app.cache import TTLCache
+from app.api.carrier_summary import CarrierSummary
+from app.config import SESSION_TTL, SESSION_CACHE_SIZE, logger
+from app.db.mongo import db, run_db
+from app import metrics
+
+SESSIONS_COLLECTION = 'verified_sessions'
+
+# Telegram user id -> session dict, for users seen since the bot started
+_memory = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_TTL)
+metrics.register_cache('verified_sessions', _memory)
+
+
+def ensure_session_indexes():
+    """Let MongoDB delete sessions once they expire."""
+    db[SESSIONS_COLLECTION].create_index([('expiresAt', ASCENDING)], expireAfterSeconds=0)
+
+
+def _load_session(user_id):
+    doc = db[SESSIONS_COLLECTION].find_one({'_id': user_id})
+    if not doc:
+        return None
+    expires_at = doc['expiresAt'].replace(tzinfo=timezone.utc).timestamp()
+    return {
+        'company': CarrierSummary.from_stored(
+            doc['company'], doc['number'] if doc['numberType'] == 'MC' else None
+        ),
+        'numberType': doc['numberType'],
+        'number': doc['number'],
+        'member': doc['member'],
+        'expiresAt': expires_at
+    }
+
+
+def _store_session(user_id, session):
+    db[SESSIONS_COLLECTION].replace_one(
+        {'_id': user_id},
+        {
+            'company': session['company'].to_dict(),
+            'numberType': session['numberType'],
+            'number': session['number'],
+            'member': session['member'],
+            'verifiedAt': datetime.now(timezone.utc),
+            'expiresAt': datetime.fromtimestamp(session['expiresAt'], tz=timezone.utc)
+        },
+        upsert=True
+    )
+
+
+async def get_session(user_id):
+    """Return the user's unexpired verified session, or None.
+
+    Only the first /start after a restart reads MongoDB; later ones are
+    answered from memory. Database errors are logged and treated as "no
+    session" so the user is simply verified again.
+    """
+    session = _memory.get(user_id)
+    if session is None:
+        try:
+            session = await run_db(_load_session, user_id)
+        except errors.PyMongoError as e:
+            logger.warning(f"Session read failed for user {user_id}: {e}")
+            return None
+        if session is None:
+            metrics.increment('sessions.miss')
+            return None
+        _memory.set(user_id, session, ttl=max(session['expiresAt'] - time.time(), 0))
+
+    if session['expiresAt'] <= time.time() or not session['member']:
+        metrics.increment('sessions.expired')
+        return None
+    metrics.increment('sessions.hit')
+    return session
+
+
+async def save_session(user_id, company: CarrierSummary, number_type, number):
+    """Remember that the user confirmed this carrier and is a channel member, for SESSION_TTL seconds."""
+    session = {
+        'company': company,
+        'numberType': number_type,
+        'number': number,
+        'member': True,
+        'expiresAt': time.time() + SESSION_TTL
+    }
+    _memory.set(user_id, session)
+    try:
+        await run_db(_store_session, user_id, session)
+    except errors.PyMongoError as e:
+        logger.warning(f"Session write failed for user {user_id}: {e}")
+    except Exception as e:  # Runs as a background task, so nothing else would report it
+        logger.error(f"Session write failed for user {user_id}: {e!r}")
+
+
+def _delete_session(user_id):
+    db[SESSIONS_COLLECTION].delete_one({'_id': user_id})
+
+
+async def end_session(user_id):
+    """Forget the user's session so the next /start verifies them again."""
+    _memory.invalidate(user_id)
+    try:
+        await run_db(_delete_session, user_id)
+    except errors.PyMongoError as e:
+        logger.warning(f"Session delete failed for user {user_id}: {e}")
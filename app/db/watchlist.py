@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument
+from app.db.mongo import db
+
+WATCHLIST_COLLECTION = 'carrier_watchlist'
+
+# Snapshot fields compared between re-checks, with the label used in change notifications
+WATCHED_FIELDS = {
+    'status': 'Verification status',
+    'allowed_to_operate': 'Allowed to operate',
+    'safety_rating': 'Safety rating',
+    'legal_name': 'Legal name',
+    'operation_type': 'Operation type',
+}
+
+
+def ensure_watchlist_indexes():
+    db[WATCHLIST_COLLECTION].create_index([('checkedAt', ASCENDING)])
+    db[WATCHLIST_COLLECTION].create_index([('subscribers', ASCENDING)])
+
+
+def snapshot_of(result):
+    """Reduce a verification result to the fields a watchlist diff compares."""
+    snapshot = dict.fromkeys(WATCHED_FIELDS)
+    snapshot['status'] = result['status']
+    if result['status'] == 'verified':
+        summary = result['data'].to_dict()
+        snapshot.update({field: summary.get(field) for field in WATCHED_FIELDS if field != 'status'})
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    """Return [(label, old value, new value)] for every watched field that changed.
+
+    Fields the old snapshot didn't know (e.g. operating authority for a carrier
+    first seen in the census index) are not reported when they are filled in.
+    """
+    return [
+        (label, old.get(field), new.get(field))
+        for field, label in WATCHED_FIELDS.items()
+        if old.get(field) != new.get(field) and (field == 'status' or old.get(field) is not None)
+    ]
+
+
+def watch(key, number_type, number, chat_id, snapshot):
+    """Subscribe a chat to a carrier, starting its snapshot if nobody watched it yet."""
+    db[WATCHLIST_COLLECTION].update_one(
+        {'_id': key},
+        {
+            '$addToSet': {'subscribers': chat_id},
+            '$setOnInsert': {
+                'numberType': number_type,
+                'number': number,
+                'snapshot': snapshot,
+                'etag': None,
+                'checkedAt': datetime.now(timezone.utc)
+            }
+        },
+        upsert=True
+    )
+
+
+def unwatch(key, chat_id):
+    """Unsubscribe a chat; carriers nobody watches any more are dropped. Returns True if the chat was subscribed."""
+    doc = db[WATCHLIST_COLLECTION].find_one_and_update(
+        {'_id': key, 'subscribers': chat_id},
+        {'$pull': {'subscribers': chat_id}},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is not None and not doc['subscribers']:
+        db[WATCHLIST_COLLECTION].delete_one({'_id': key, 'subscribers': {'$size': 0}})
+    return doc is not None
+
+
+def watched_by(chat_id):
+    return list(db[WATCHLIST_COLLECTION].find({'subscribers': chat_id}, {'snapshot': 1, 'numberType': 1, 'number': 1}))
+
+
+def due_for_recheck(older_than_seconds, limit):
+    """Return up to `limit` entries not checked for older_than_seconds, least recently checked first."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than_seconds)
+    return list(
+        db[WATCHLIST_COLLECTION]
+        .find({'checkedAt': {'$lt': cutoff}})
+        .sort('checkedAt', ASCENDING)
+        .limit(limit)
+    )
+
+
+def record_check(key, snapshot, etag):
+    db[WATCHLIST_COLLECTION].update_one(
+        {'_id': key},
+        {'$set': {'snapshot': snapshot, 'etag': etag, 'checkedAt': datetime.now(timezone.utc)}}
+    )
@@ -1,5 +1,6 @@
 import logging
-from telegram.ext import Application, CommandHandler, ConversationHandler, MessageHandler, filters
+from telegram import Update
+from telegram.ext import Application, ChatMemberHandler, CommandHandler, ConversationHandler, MessageHandler, filters
 from app.bot.handlers import (
     start, 
     enter_number, 
@@ -10,14 +11,70 @@ from app.bot.handlers import (
     cancel, 
     help_command
 )
-from app.bot.lookup import lookup_start, lookup_process, cancel_lookup
-from app.config import TELEGRAM_API_KEY
+from app.bot.membership import refresh_memberships, membership_changed
+from app.bot.watchlist import watch_command, unwatch_command, watchlist_command, recheck_watchlist
+from app.bot.conversation import load_tokenizer
+from app.bot.lookup import lookup_start, lookup_process, lookup_document, cancel_lookup
+from app.config import (
+    TELEGRAM_API_KEY,
+    LANE_INDEX_ENABLED,
+    LANE_INDEX_REFRESH_SECONDS,
+    METRICS_LOG_SECONDS,
+    MEMBERSHIP_REFRESH_SECONDS,
+    WATCHLIST_JOB_SECONDS
+)
+from app.db.mongo import close_client, run_db
+from app.api.http import close_http_client
+from app.api.carrier_cache import ensure_carrier_cache_indexes
+from app.db.sessions import ensure_session_indexes
+from app.db.watchlist import ensure_watchlist_indexes
+from app import metrics
+from app.db.lane_index import lane_index
 
 # Setup logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-application = Application.builder().token(TELEGRAM_API_KEY).build()
+async def refresh_lane_index(context) -> None:
+    """Reload the in-memory lane index from MongoDB."""
+    try:
+        await run_db(lane_index.refresh)
+    except Exception as e:
+        logger.error(f"Lane index refresh failed, keeping the previous snapshot: {e}")
+
+async def log_metrics(context) -> None:
+    """Write the current metrics snapshot to the log."""
+    logger.info(f"Metrics: {metrics.snapshot()}")
+
+async def post_init(application: Application) -> None:
+    """Create the indexes and load the tokenizer the bot relies on before handling updates."""
+    try:
+        await run_db(ensure_carrier_cache_indexes)
+    except Exception as e:
+        logger.error(f"Could not create carrier cache indexes: {e}")
+    try:
+        await run_db(ensure_session_indexes)
+    except Exception as e:
+        logger.error(f"Could not create session indexes: {e}")
+    try:
+        await run_db(ensure_watchlist_indexes)
+    except Exception as e:
+        logger.error(f"Could not create watchlist indexes: {e}")
+    # Loaded now so the first conversational reply doesn't wait for tiktoken's download
+    await load_tokenizer()
+
+async def post_shutdown(application: Application) -> None:
+    """Release the shared database and HTTP clients when the bot stops."""
+    close_client()
+    await close_http_client()
+
+application = (
+    Application.builder()
+    .token(TELEGRAM_API_KEY)
+    .post_init(post_init)
+    .post_shutdown(post_shutdown)
+    .build()
+)
 
 # Define conversation states
 (START, ENTER_NUMBER, CONFIRM_COMPANY, AWAITING_RATE_COMMAND, 
@@ -35,7 +92,10 @@ conv_handler = ConversationHandler(
         ],
         INITIALIZE_RATE_QUOTE: [MessageHandler(filters.TEXT & ~filters.COMMAND, extract_and_calculate_rate_quote)],
         POST_RATE_ACTION: [MessageHandler(filters.TEXT, post_rate_action)],
-        LOOKUP_NUMBER: [MessageHandler(filters.TEXT & ~filters.COMMAND, lookup_process)],
+        LOOKUP_NUMBER: [
+            MessageHandler(filters.TEXT & ~filters.COMMAND, lookup_process),
+            MessageHandler(filters.Document.ALL, lookup_document),
+        ],
     },
     fallbacks=[CommandHandler('cancel', cancel)],
 )
@@ -43,7 +103,19 @@ conv_handler = ConversationHandler(
 # Add handlers to the application
 application.add_handler(conv_handler)
 application.add_handler(CommandHandler('help', help_command))
+application.add_handler(CommandHandler('watch', watch_command))
+application.add_handler(CommandHandler('unwatch', unwatch_command))
+application.add_handler(CommandHandler('watchlist', watchlist_command))
+# Only delivered while the bot is an administrator of the membership channel
+application.add_handler(ChatMemberHandler(membership_changed, ChatMemberHandler.CHAT_MEMBER))
+
+application.job_queue.run_repeating(log_metrics, interval=METRICS_LOG_SECONDS, first=METRICS_LOG_SECONDS)
+application.job_queue.run_repeating(refresh_memberships, interval=MEMBERSHIP_REFRESH_SECONDS, first=MEMBERSHIP_REFRESH_SECONDS)
+application.job_queue.run_repeating(recheck_watchlist, interval=WATCHLIST_JOB_SECONDS, first=WATCHLIST_JOB_SECONDS)
+if LANE_INDEX_ENABLED:
+    application.job_queue.run_repeating(refresh_lane_index, interval=LANE_INDEX_REFRESH_SECONDS, first=0)
 
 # Start the bot
 if __name__ == '__main__':
-    application.run_polling()
+    # chat_member updates are not sent unless requested explicitly
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
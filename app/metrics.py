@@ -0,0 +1,49 @@
+from collections import defaultdict
+from threading import Lock
+
+_lock = Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_summaries = {}  # name -> [count, total, max]
+_caches = {}
+
+
+def increment(name, value=1):
+    """Add value to a counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    """Record the current value of a gauge."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """Record one observation (e.g. an age or a latency) in a count/mean/max summary."""
+    with _lock:
+        summary = _summaries.setdefault(name, [0, 0.0, float('-inf')])
+        summary[0] += 1
+        summary[1] += value
+        summary[2] = max(summary[2], value)
+
+
+def register_cache(name, cache):
+    """Include a cache's stats() in every snapshot."""
+    _caches[name] = cache
+
+
+def snapshot():
+    """Return every metric as a plain dict."""
+    with _lock:
+        data = {
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+            'summaries': {
+                name: {'count': count, 'mean': total / count, 'max': maximum}
+                for name, (count, total, maximum) in _summaries.items()
+            }
+        }
+    data['caches'] = {name: cache.stats() for name, cache in _caches.items()}
+    return data
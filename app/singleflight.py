@@ -0,0 +1,51 @@
+import asyncio
+from app import metrics
+
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception). A waiter that is
+    cancelled only cancels the shared work if nobody else is waiting on it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, func):
+        """Return the result of `await func()`, sharing it with concurrent callers using the same key."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.get_running_loop().create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            metrics.increment(f'singleflight.{self.name}.leader')
+        else:
+            metrics.increment(f'singleflight.{self.name}.shared')
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def __len__(self):
+        return len(self._calls)
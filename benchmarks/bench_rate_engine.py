@@ -0,0 +1,169 @@
+"""Measure latency and throughput of the historical rate engines.
+
+Engines:
+  lane_index  in-process LaneIndex built from generated loads (no database needed)
+  lane_stats  pre-aggregated lane_stats buckets in MongoDB
+  aggregate   $facet ring pipeline over hive-cx-data in MongoDB
+  quote       calculate_approximate_rate_quote end to end
+
+    python -m benchmarks.bench_rate_engine --engine lane_index --loads 1000000
+    python -m benchmarks.bench_rate_engine --engine lane_stats --engine aggregate --concurrency 16
+
+The MongoDB engines read the database MONGO_CLIENT points at. Fill a local
+mongod with benchmarks.generate_loads --mongo, then run app.db.migrations and
+app.db.lane_stats before benchmarking. The lane_index engine only needs the
+environment variables app.config requires to be set; dummy values are fine.
+"""
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+from app.config import RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES
+from app.db.normalize import normalize_load_document
+from benchmarks.generate_loads import LaneSampler, generate_loads, road_miles
+
+
+def make_queries(count, seed):
+    """Build a quote workload whose lane mix follows the same popularity skew as the loads."""
+    rng = random.Random(seed)
+    sampler = LaneSampler(random.Random(42))  # Same lane ranking as generate_loads' default seed
+    queries = []
+    for _ in range(count):
+        origin, destination = sampler.sample()
+        queries.append({
+            'shipperCity': origin,
+            'consigneeCity': destination,
+            'billDistance': int(road_miles(origin, destination) * rng.uniform(0.95, 1.08)),
+            'weight': int(rng.uniform(10000, 44000)),
+            'equipmentType': rng.choice('VRF'),
+            'driverAssistance': 'No',
+            'hazmatRouting': 'No'
+        })
+    return queries
+
+
+def lane_index_engine(loads, seed):
+    from app.db.lane_index import LaneIndex
+
+    index = LaneIndex(max_bytes=2 ** 40)
+    started = time.perf_counter()
+    index.load(normalize_load_document(document) for document in generate_loads(loads, seed))
+    print(f"Built lane index over {loads} loads in {time.perf_counter() - started:.1f}s ({index.nbytes / 2 ** 20:.1f} MB)")
+
+    async def run(query):
+        return index.widening_window(
+            query['shipperCity'], query['consigneeCity'], query['equipmentType'],
+            query['billDistance'], query['weight'], RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES
+        )
+    return run
+
+
+def lane_stats_engine():
+    from app.db.lane_stats import fetch_lane_rings
+    from app.db.mongo import run_db
+    from app.db.pipelines import select_ring
+
+    def window(query):
+        results = fetch_lane_rings(query['shipperCity'], query['consigneeCity'], query['equipmentType'],
+                                   query['billDistance'], query['weight'], RATE_TOLERANCE_RINGS)
+        return select_ring(results, RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES)
+
+    async def run(query):
+        return await run_db(window, query)
+    return run
+
+
+def aggregate_engine():
+    from app.bot.calculations import _aggregate_rings
+    from app.db.mongo import run_db
+    from app.db.pipelines import select_ring
+
+    def window(query):
+        results = _aggregate_rings(query['shipperCity'], query['consigneeCity'], query['equipmentType'],
+                                   query['billDistance'], query['weight'])
+        return select_ring(results, RATE_TOLERANCE_RINGS, RATE_MIN_SAMPLES)
+
+    async def run(query):
+        return await run_db(window, query)
+    return run
+
+
+def quote_engine(warm_cache):
+    from app.bot.calculations import calculate_approximate_rate_quote, quote_cache
+
+    async def send_chat_action(**kwargs):
+        pass
+
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=0))
+    context = SimpleNamespace(bot=SimpleNamespace(send_chat_action=send_chat_action))
+
+    async def run(query):
+        if not warm_cache:
+            quote_cache.clear()
+        return await calculate_approximate_rate_quote(query, update, context)
+    return run
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def measure(engine, queries, concurrency):
+    """Run the workload with `concurrency` workers and return per-query latencies and wall time."""
+    latencies = []
+    answered = 0
+    pending = iter(queries)
+
+    async def worker():
+        nonlocal answered
+        for query in pending:
+            started = time.perf_counter()
+            result = await engine(query)
+            latencies.append(time.perf_counter() - started)
+            answered += result is not None
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), answered, time.perf_counter() - started
+
+
+def report(name, latencies, answered, elapsed):
+    ms = [latency * 1000 for latency in latencies]
+    print(
+        f"{name:<12} queries={len(ms):<7} answered={answered / len(ms):6.1%} "
+        f"p50={percentile(ms, 0.50):8.3f}ms p99={percentile(ms, 0.99):8.3f}ms "
+        f"mean={sum(ms) / len(ms):8.3f}ms throughput={len(ms) / elapsed:10.1f}/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', action='append', choices=['lane_index', 'lane_stats', 'aggregate', 'quote'])
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--loads', type=int, default=200000, help="Loads generated for the lane_index engine")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--warm-cache', action='store_true', help="Let the quote engine reuse cached quotes")
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries, args.seed + 1)
+    for name in args.engine or ['lane_index']:
+        if name == 'lane_index':
+            engine = lane_index_engine(args.loads, args.seed)
+        elif name == 'lane_stats':
+            engine = lane_stats_engine()
+        elif name == 'aggregate':
+            engine = aggregate_engine()
+        else:
+            engine = quote_engine(args.warm_cache)
+
+        asyncio.run(measure(engine, queries[:args.warmup], 1))
+        report(name, *asyncio.run(measure(engine, queries, args.concurrency)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Generate synthetic hive-cx-data loads for benchmarking the rate engine.
+
+Documents use the same raw field names the rate pipeline reads and mix
+numeric and string encodings the way the real collection does. Lane
+popularity follows a Zipf distribution so a few lanes are very hot.
+
+    python -m benchmarks.generate_loads --count 1000000 --out loads.jsonl
+    python -m benchmarks.generate_loads --count 1000000 --mongo
+
+--mongo writes into hive-cx-data of the database MONGO_CLIENT points at;
+use a local mongod, never production.
+"""
+import argparse
+import json
+import math
+import random
+from itertools import islice
+
+CITIES = {
+    'ATLANTA': (33.75, -84.39), 'AUSTIN': (30.27, -97.74), 'BALTIMORE': (39.29, -76.61),
+    'BIRMINGHAM': (33.52, -86.80), 'BOSTON': (42.36, -71.06), 'BUFFALO': (42.89, -78.88),
+    'CHARLOTTE': (35.23, -80.84), 'CHICAGO': (41.88, -87.63), 'CINCINNATI': (39.10, -84.51),
+    'CLEVELAND': (41.50, -81.69), 'COLUMBUS': (39.96, -83.00), 'DALLAS': (32.78, -96.80),
+    'DENVER': (39.74, -104.99), 'DETROIT': (42.33, -83.05), 'EL PASO': (31.76, -106.49),
+    'FORT WORTH': (32.76, -97.33), 'FRESNO': (36.74, -119.79), 'HOUSTON': (29.76, -95.37),
+    'INDIANAPOLIS': (39.77, -86.16), 'JACKSONVILLE': (30.33, -81.66), 'KANSAS CITY': (39.10, -94.58),
+    'LAREDO': (27.53, -99.49), 'LAS VEGAS': (36.17, -115.14), 'LOS ANGELES': (34.05, -118.24),
+    'LOUISVILLE': (38.25, -85.76), 'MEMPHIS': (35.15, -90.05), 'MIAMI': (25.76, -80.19),
+    'MILWAUKEE': (43.04, -87.91), 'MINNEAPOLIS': (44.98, -93.27), 'NASHVILLE': (36.16, -86.78),
+    'NEWARK': (40.74, -74.17), 'OKLAHOMA CITY': (35.47, -97.52), 'OMAHA': (41.26, -95.93),
+    'ORLANDO': (28.54, -81.38), 'PHILADELPHIA': (39.95, -75.17), 'PHOENIX': (33.45, -112.07),
+    'PITTSBURGH': (40.44, -79.99), 'PORTLAND': (45.52, -122.68), 'RALEIGH': (35.78, -78.64),
+    'RENO': (39.53, -119.81), 'RICHMOND': (37.54, -77.44), 'SACRAMENTO': (38.58, -121.49),
+    'SALT LAKE CITY': (40.76, -111.89), 'SAN ANTONIO': (29.42, -98.49), 'SAN DIEGO': (32.72, -117.16),
+    'SAVANNAH': (32.08, -81.09), 'SEATTLE': (47.61, -122.33), 'ST LOUIS': (38.63, -90.20),
+    'TAMPA': (27.95, -82.46), 'TULSA': (36.15, -95.99),
+}
+
+# Trailer type -> (share of loads, rate per mile)
+TRAILER_TYPES = {'V': (0.6, 2.10), 'R': (0.25, 2.45), 'F': (0.15, 2.60)}
+
+
+def road_miles(origin, destination):
+    """Approximate road distance between two cities."""
+    (lat1, lon1), (lat2, lon2) = CITIES[origin], CITIES[destination]
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 3959 * 2 * math.asin(math.sqrt(a)) * 1.2
+
+
+class LaneSampler:
+    """Draws lanes with Zipf-distributed popularity."""
+
+    def __init__(self, rng, skew=1.1):
+        cities = sorted(CITIES)
+        self.lanes = [(o, d) for o in cities for d in cities if o != d]
+        rng.shuffle(self.lanes)
+        weights = [1 / (rank ** skew) for rank in range(1, len(self.lanes) + 1)]
+        total = 0.0
+        self.cum_weights = []
+        for weight in weights:
+            total += weight
+            self.cum_weights.append(total)
+        self.rng = rng
+
+    def sample(self):
+        return self.rng.choices(self.lanes, cum_weights=self.cum_weights)[0]
+
+
+def _encode(rng, value, suffix):
+    """Store a number the inconsistent ways hive-cx-data does: int, float, or string."""
+    style = rng.random()
+    if style < 0.5:
+        return int(value)
+    if style < 0.8:
+        return f"{int(value):,}"
+    if style < 0.95:
+        return float(round(value, 1))
+    return f"{int(value)}{suffix}"
+
+
+def generate_loads(count, seed=42, skew=1.1):
+    """Yield `count` synthetic historical load documents."""
+    rng = random.Random(seed)
+    sampler = LaneSampler(rng, skew)
+    trailer_codes = list(TRAILER_TYPES)
+    trailer_shares = [TRAILER_TYPES[code][0] for code in trailer_codes]
+
+    for _ in range(count):
+        origin, destination = sampler.sample()
+        trailer = rng.choices(trailer_codes, weights=trailer_shares)[0]
+        miles = max(25.0, road_miles(origin, destination) * rng.uniform(0.93, 1.1))
+        weight = rng.triangular(5000, 45000, 38000)
+        rate = max(350.0, miles * TRAILER_TYPES[trailer][1] * rng.lognormvariate(0, 0.15) + weight * 0.002)
+        yield {
+            'Shipper city': origin,
+            'Consignee city': destination,
+            'Trailer type': trailer,
+            'Bill Distance': _encode(rng, miles, ' miles'),
+            'Weight': _encode(rng, weight, ' lbs'),
+            'Rate': round(rate, 2)
+        }
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_jsonl(documents, path):
+    with open(path, 'w') as handle:
+        for document in documents:
+            handle.write(json.dumps(document) + '\n')
+
+
+def insert_into_mongo(documents, batch_size=10000):
+    """Insert normalized documents into hive-cx-data of the configured database."""
+    from app.db.mongo import hiveData, notify_ingest
+    from app.db.normalize import normalize_load_document
+
+    inserted = 0
+    for batch in _batches(documents, batch_size):
+        hiveData.insert_many([normalize_load_document(document) for document in batch], ordered=False)
+        inserted += len(batch)
+        print(f"Inserted {inserted} loads")
+    notify_ingest()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent for lane popularity")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--out', help="Write JSON lines to this file")
+    target.add_argument('--mongo', action='store_true', help="Insert into hive-cx-data")
+    args = parser.parse_args()
+
+    documents = generate_loads(args.count, args.seed, args.skew)
+    if args.out:
+        write_jsonl(documents, args.out)
+    else:
+        insert_into_mongo(documents)
+
+
+if __name__ == '__main__':
+    main()
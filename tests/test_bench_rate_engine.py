@@ -0,0 +1,20 @@
+import asyncio
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from benchmarks.bench_rate_engine import lane_index_engine, make_queries, measure
+
+
+class TestBenchRateEngine(unittest.TestCase):
+
+    def test_lane_index_engine_answers_queries(self):
+        with redirect_stdout(StringIO()):
+            engine = lane_index_engine(500, seed=42)
+        queries = make_queries(50, seed=43)
+        latencies, answered, elapsed = asyncio.run(measure(engine, queries, 2))
+        self.assertEqual(len(latencies), len(queries))
+        self.assertGreater(answered, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
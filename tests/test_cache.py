@@ -0,0 +1,60 @@
+import unittest
+from app.cache import TTLCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=3, ttl=10, clock=self.clock)
+
+    def test_get_counts_hits_and_misses(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=30)
+        self.clock.now = 11
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertNotIn('a', self.cache)
+
+    def test_keys_skip_expired_entries(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=30)
+        self.clock.now = 11
+        self.assertEqual(self.cache.keys(), ['b'])
+
+    def test_least_recently_used_is_evicted(self):
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.cache.get('a')
+        self.cache.set('d', 'd')
+        self.assertIn('a', self.cache)
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_invalidate_where(self):
+        self.cache.set(('DALLAS', 'HOUSTON', 1), 'x')
+        self.cache.set(('DALLAS', 'HOUSTON', 2), 'y')
+        self.cache.set(('AUSTIN', 'HOUSTON', 1), 'z')
+        dropped = self.cache.invalidate_where(lambda key: key[:2] == ('DALLAS', 'HOUSTON'))
+        self.assertEqual(dropped, 2)
+        self.assertEqual(len(self.cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import weakref
+import unittest
+from app.api.carrier_summary import CarrierSummary
+
+FMCSA_CONTENT = {
+    'carrier': {
+        'legalName': 'ACME TRUCKING LLC',
+        'dbaName': None,
+        'dotNumber': 1234567,
+        'allowedToOperate': 'Y',
+        'safetyRating': 'S',
+        'carrierOperation': {'carrierOperationCode': 'A', 'carrierOperationDesc': 'Interstate'},
+        'totalDrivers': 14,
+        'driverInsp': 9,
+        'vehicleInsp': 6,
+        'phyStreet': '1 MAIN ST',
+        'phyCity': 'DALLAS',
+        'phyState': 'TX',
+        'phyZipcode': '75201',
+        'oosDate': None,
+    },
+    '_links': {'basics': {'href': 'https://mobile.fmcsa.dot.gov/qc/services/carriers/1234567/basics'}},
+}
+
+
+class TestCarrierSummary(unittest.TestCase):
+
+    def test_from_fmcsa_keeps_rendered_fields(self):
+        summary = CarrierSummary.from_fmcsa(FMCSA_CONTENT, mc_number='0654321')
+        self.assertEqual(summary.name, 'ACME TRUCKING LLC')
+        self.assertEqual(summary.dot_number, '1234567')
+        self.assertEqual(summary.mc_number, '654321')
+        self.assertEqual(summary.operation_type, 'Interstate')
+        self.assertEqual(summary.inspections, 15)
+        self.assertEqual(summary.address, '1 MAIN ST, DALLAS, TX, 75201')
+        self.assertFalse(hasattr(summary, '__dict__'))
+
+    def test_equal_summaries_are_interned_by_dot(self):
+        first = CarrierSummary.from_fmcsa(FMCSA_CONTENT)
+        second = CarrierSummary.from_fmcsa(FMCSA_CONTENT)
+        self.assertIs(first, second)
+        self.assertIs(CarrierSummary.from_dict(first.to_dict()), first)
+        self.assertIsNotNone(weakref.ref(first))
+
+    def test_from_stored_reads_legacy_fmcsa_documents(self):
+        summary = CarrierSummary.from_stored(FMCSA_CONTENT, mc_number='654321')
+        self.assertEqual(summary.legal_name, 'ACME TRUCKING LLC')
+        self.assertEqual(summary.mc_number, '654321')
+        self.assertIs(CarrierSummary.from_stored(summary.to_dict()), summary)
+
+    def test_missing_fields(self):
+        summary = CarrierSummary.from_fmcsa({'carrier': {'dbaName': 'ACME'}})
+        self.assertEqual(summary.name, 'ACME')
+        self.assertIsNone(summary.inspections)
+        self.assertIsNone(summary.address)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+from app.db.census import CensusIndex, build_census_index
+
+CENSUS_CSV = """\ufeffDOT_NUMBER,LEGAL_NAME,DBA_NAME,STATUS_CODE,PHY_STREET,PHY_CITY,PHY_STATE,PHY_ZIP,NBR_POWER_UNIT,DRIVER_TOTAL,DOCKET1PREFIX,DOCKET1,DOCKET2PREFIX,DOCKET2
+1234567,ACME TRUCKING LLC,,A,1 MAIN ST,DALLAS,TX,75201,12,14,MC,654321,FF,42
+7654321,GONE FREIGHT INC,,I,2 ELM ST,TULSA,OK,74103,1,1,MC,111111,,
+,NO DOT ROW,,A,,,,,,,,,,
+"""
+
+
+class TestCensusIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.directory.name, 'census.csv')
+        self.db_path = os.path.join(self.directory.name, 'census.sqlite3')
+        with open(self.csv_path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write(CENSUS_CSV)
+        self.loaded = build_census_index(self.csv_path, self.db_path, snapshot_time=time.time())
+        self.index = CensusIndex(self.db_path, max_age=3600)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_skips_rows_without_dot_number(self):
+        self.assertEqual(self.loaded, 2)
+
+    def test_lookup_by_dot_and_docket(self):
+        by_dot = self.index.lookup('DOT', '01234567')
+        by_mc = self.index.lookup('MC', '654321')
+        self.assertEqual(by_dot['status'], 'verified')
+        self.assertEqual(by_dot['data'].legal_name, 'ACME TRUCKING LLC')
+        self.assertEqual(by_dot['data'].drivers, 14)
+        self.assertIsNone(by_dot['data'].allowed_to_operate)  # Authority isn't in the census
+        self.assertEqual(by_mc['data'].dot_number, '1234567')
+        self.assertEqual(by_mc['data'].mc_number, '654321')
+        self.assertEqual(self.index.lookup('FF', '42')['data'].dot_number, '1234567')
+
+    def test_unknown_and_inactive_carriers_fall_through(self):
+        self.assertIsNone(self.index.lookup('MC', '999999'))
+        self.assertIsNone(self.index.lookup('MC', '111111'))
+        self.assertIsNotNone(self.index.find('MC', '111111'))
+
+    def test_stale_snapshot_is_ignored(self):
+        build_census_index(self.csv_path, self.db_path, snapshot_time=time.time() - 7200)
+        self.assertIsNone(self.index.lookup('DOT', '1234567'))
+
+    def test_missing_file(self):
+        index = CensusIndex(os.path.join(self.directory.name, 'missing.sqlite3'), max_age=3600)
+        self.assertIsNone(index.lookup('DOT', '1234567'))
+
+
+if __name__ == '__main__':
+    unittest.main()
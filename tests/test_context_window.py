@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from app.api.context_window import ConversationWindow, Tokenizer, SUMMARY_PREFIX
+
+
+class WordTokenizer(Tokenizer):
+    """One token per word, so budgets in the tests are easy to follow."""
+
+    def __init__(self):
+        self.model = 'words'
+        self.encoding = None
+
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return ' '.join(text.split()[:max(max_tokens, 0)])
+
+
+def words(n, word='load'):
+    return ' '.join([word] * n)
+
+
+class TestConversationWindow(unittest.TestCase):
+
+    def make_window(self, budget=100, summary_budget=10):
+        return ConversationWindow(words(10, 'system'), budget, summary_budget, WordTokenizer())
+
+    def test_keeps_system_prompt_and_stays_within_budget(self):
+        window = self.make_window()
+        for i in range(30):
+            window.add('user' if i % 2 == 0 else 'assistant', words(8, f'turn{i}'))
+            self.assertLessEqual(window.tokens, window.budget)
+            self.assertEqual(window.messages()[0], {'role': 'system', 'content': words(10, 'system')})
+        self.assertEqual(window.messages()[-1]['content'], words(8, 'turn29'))
+        self.assertTrue(window.pending)
+
+    def test_compact_folds_evicted_turns_into_summary(self):
+        window = self.make_window()
+        for i in range(12):
+            window.add('user', words(8, f'turn{i}'))
+        seen = []
+
+        async def summarize(summary, messages):
+            seen.append((summary, [m['content'] for m in messages]))
+            return words(20, 'summary')  # Longer than summary_budget, so it is truncated
+
+        asyncio.run(window.compact(summarize))
+        self.assertEqual(seen[0][0], '')
+        self.assertEqual(window.pending, [])
+        self.assertEqual(window.messages()[1], {'role': 'system', 'content': SUMMARY_PREFIX + words(10, 'summary')})
+        self.assertLessEqual(window.tokens, window.budget)
+
+        asyncio.run(window.compact(summarize))  # Nothing new left the window, so the summary is reused
+        self.assertEqual(len(seen), 1)
+
+    def test_failed_summary_keeps_turns_pending(self):
+        window = self.make_window()
+        for i in range(12):
+            window.add('user', words(8, f'turn{i}'))
+        pending = window.pending
+
+        async def summarize(summary, messages):
+            raise RuntimeError('unavailable')
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(window.compact(summarize))
+        self.assertEqual(window.pending, pending)
+
+    def test_oversized_turn_is_truncated_to_fit(self):
+        window = self.make_window()
+        window.add('user', words(500))
+        self.assertLessEqual(window.tokens, window.budget)
+        self.assertEqual(len(window.messages()), 2)
+
+    def test_budget_too_small_for_system_prompt(self):
+        with self.assertRaises(ValueError):
+            self.make_window(budget=20)
+
+
+if __name__ == '__main__':
+    unittest.main()
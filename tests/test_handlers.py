@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../app/bot')))
 
+import asyncio
 import unittest
 from unittest.mock import AsyncMock, patch
 from handlers import confirm_company, rate_quote
@@ -9,7 +10,8 @@ from telegram import ReplyKeyboardRemove
 from app.bot.handlers import (
     AWAITING_RATE_COMMAND,
     ENTER_NUMBER,
-    INITIALIZE_RATE_QUOTE
+    INITIALIZE_RATE_QUOTE,
+    refine_rate_quote
 )
 
 class TestHandlers(unittest.IsolatedAsyncioTestCase):
@@ -56,6 +58,14 @@ class TestHandlers(unittest.IsolatedAsyncioTestCase):
             text="Sure, let's calculate a rate quote. Please provide these details about the load: shipper city, consignee city, distance, weight, equipment type, hazmat (yes/no), number of extra stops, and driver assistance (yes/no).",
             reply_markup=ReplyKeyboardRemove(),
         )
+    @patch('app.bot.handlers.historical_rate_quote', new_callable=AsyncMock, side_effect=asyncio.CancelledError)
+    async def test_refine_rate_quote_cancelled_keeps_estimate(self, mock_historical_rate_quote):
+        message = AsyncMock()
+        with self.assertRaises(asyncio.CancelledError):
+            await refine_rate_quote(message, {}, '$1,000.00')
+        message.edit_text.assert_called_once_with(
+            "The estimated rate is: $1,000.00\n\nThe historical rate lookup was cancelled, so this estimate stands."
+        )
 
 if __name__ == '__main__':
     unittest.main()
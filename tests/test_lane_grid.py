@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from app.db.lane_grid import LaneGrid
+
+
+class TestLaneGrid(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.distance = rng.uniform(200, 400, size=2000)
+        self.weight = rng.uniform(10000, 45000, size=2000)
+        self.rate = rng.uniform(500, 1500, size=2000)
+        self.grid = LaneGrid(self.distance, self.weight, self.rate, distance_bin=10, weight_bin=500)
+
+    def brute_force(self, bill_distance, weight, distance_tolerance, weight_tolerance):
+        distance_cells = np.floor(self.distance / 10)
+        weight_cells = np.floor(self.weight / 500)
+        mask = (
+            (distance_cells >= np.floor((bill_distance - distance_tolerance) / 10)) &
+            (distance_cells <= np.floor((bill_distance + distance_tolerance) / 10)) &
+            (weight_cells >= np.floor((weight - weight_tolerance) / 500)) &
+            (weight_cells <= np.floor((weight + weight_tolerance) / 500))
+        )
+        return self.rate[mask]
+
+    def test_window_matches_brute_force(self):
+        for args in [(300, 30000, 60, 3500), (205, 11000, 60, 3500), (390, 44000, 120, 7000)]:
+            expected = self.brute_force(*args)
+            result = self.grid.window(*args)
+            self.assertEqual(result['count'], len(expected))
+            self.assertAlmostEqual(result['averageRate'], expected.mean(), places=6)
+            self.assertAlmostEqual(result['stdDev'], expected.std(), places=4)
+
+    def test_window_outside_grid_is_empty(self):
+        self.assertIsNone(self.grid.window(1500, 30000, 60, 3500))
+        self.assertIsNone(self.grid.window(300, 90000, 60, 3500))
+
+    def test_window_clipped_to_grid_edge(self):
+        result = self.grid.window(300, 30000, 200, 30000)
+        self.assertEqual(result['count'], len(self.rate))
+
+    def test_cells_for(self):
+        cells = LaneGrid.cells_for(self.distance, self.weight, 10, 500)
+        self.assertEqual(cells, (self.grid.count.shape[0] - 1) * (self.grid.count.shape[1] - 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from app.db import lane_index as lane_index_module
+from app.db.lane_index import LaneIndex, BYTES_PER_LOAD
+from app.db.normalize import (
+    SHIPPER_CITY_KEY, CONSIGNEE_CITY_KEY, EQUIPMENT_KEY, BILL_DISTANCE_NUM, WEIGHT_NUM, RATE_NUM
+)
+
+
+def loads(shipper_city, consignee_city, count, equipment='V'):
+    return [
+        {SHIPPER_CITY_KEY: shipper_city, CONSIGNEE_CITY_KEY: consignee_city, EQUIPMENT_KEY: equipment,
+         BILL_DISTANCE_NUM: 300.0 + i, WEIGHT_NUM: 20000.0, RATE_NUM: 900.0}
+        for i in range(count)
+    ]
+
+
+class TestLaneIndexBudget(unittest.TestCase):
+
+    def test_plan_keeps_busiest_lanes_within_budget(self):
+        index = LaneIndex(max_bytes=25 * BYTES_PER_LOAD)
+        planned = index.plan([('A', 'B', 'V', 10), ('C', 'D', 'V', 20), ('E', 'F', 'R', 5)])
+        self.assertEqual(planned, [('C', 'D', 'V'), ('E', 'F', 'R')])
+
+    def test_refresh_only_fetches_planned_lanes(self):
+        documents = loads('DALLAS', 'HOUSTON', 20) + loads('AUSTIN', 'EL PASO', 10)
+        collection = MagicMock()
+        collection.aggregate.return_value = [
+            {'_id': {'s': 'DALLAS', 'c': 'HOUSTON', 'e': 'V'}, 'count': 20},
+            {'_id': {'s': 'AUSTIN', 'c': 'EL PASO', 'e': 'V'}, 'count': 10},
+        ]
+
+        def find(query, projection, batch_size):
+            keys = (SHIPPER_CITY_KEY, CONSIGNEE_CITY_KEY, EQUIPMENT_KEY)
+            lanes = {tuple(clause[key] for key in keys) for clause in query['$or']}
+            return [doc for doc in documents if tuple(doc[key] for key in keys) in lanes]
+
+        collection.find.side_effect = find
+        index = LaneIndex(max_bytes=25 * BYTES_PER_LOAD)
+        with patch.object(lane_index_module, 'hiveData', collection):
+            self.assertEqual(index.refresh(), 1)
+        self.assertTrue(index.has_lane('Dallas', 'Houston', 'v'))
+        self.assertFalse(index.has_lane('Austin', 'El Paso', 'V'))
+        self.assertLessEqual(index.nbytes, index.max_bytes)
+        query = collection.find.call_args.args[0]
+        self.assertEqual(query['$or'], [{SHIPPER_CITY_KEY: 'DALLAS', CONSIGNEE_CITY_KEY: 'HOUSTON', EQUIPMENT_KEY: 'V'}])
+
+    def test_window_only_averages_matching_equipment(self):
+        index = LaneIndex(max_bytes=100 * BYTES_PER_LOAD)
+        reefer = [dict(doc, **{RATE_NUM: 1500.0}) for doc in loads('DALLAS', 'HOUSTON', 5, 'R')]
+        index.load(loads('DALLAS', 'HOUSTON', 5) + reefer)
+        self.assertEqual(index.window('Dallas', 'Houston', 'R', 302, 20000, 50, 1000)['averageRate'], 1500.0)
+        self.assertEqual(index.window('Dallas', 'Houston', 'V', 302, 20000, 50, 1000)['averageRate'], 900.0)
+        self.assertIsNone(index.window('Dallas', 'Houston', 'F', 302, 20000, 50, 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
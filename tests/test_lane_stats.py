@@ -0,0 +1,66 @@
+import statistics
+import unittest
+from unittest.mock import MagicMock, patch
+from app.db import lane_stats
+from app.db.lane_stats import LANE_STATS_COLLECTION, fetch_lane_rings
+
+
+def bucket(distance_bucket, weight_bucket, rates, equipment='V'):
+    return {
+        'shipperCity': 'DALLAS', 'consigneeCity': 'HOUSTON', 'equipment': equipment,
+        'distanceBucket': distance_bucket, 'weightBucket': weight_bucket,
+        'count': len(rates), 'rateSum': float(sum(rates)), 'rateSumSq': float(sum(rate ** 2 for rate in rates))
+    }
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if not condition['$gte'] <= document[field] <= condition['$lte']:
+                return False
+        elif document[field] != condition:
+            return False
+    return True
+
+
+class TestFetchLaneRings(unittest.TestCase):
+
+    def fetch(self, buckets, *args):
+        collection = MagicMock()
+        collection.find.side_effect = lambda query, projection, **kwargs: [doc for doc in buckets if matches(doc, query)]
+        with patch.object(lane_stats, 'db', {LANE_STATS_COLLECTION: collection}), \
+                patch.object(lane_stats, 'LANE_STATS_DISTANCE_BUCKET', 50), \
+                patch.object(lane_stats, 'LANE_STATS_WEIGHT_BUCKET', 1000):
+            results = fetch_lane_rings('Dallas', 'Houston', 'v', *args)
+        return results, collection.find.call_args.args[0]
+
+    def test_rings_sum_their_own_buckets(self):
+        buckets = [
+            bucket(6, 20, [1000, 1000]),  # 300-349 miles, 20000-20999 lbs
+            bucket(6, 21, [1200]),  # Edge of the tight ring's weight range
+            bucket(7, 22, [1600]),  # Only in the wide ring
+            bucket(8, 20, [5000]),  # Outside both rings
+            bucket(6, 20, [9000], equipment='R')
+        ]
+        results, query = self.fetch(buckets, 310, 20500, [(10, 500), (60, 1500)])
+
+        self.assertEqual(query['equipment'], 'V')
+        self.assertEqual(query['distanceBucket'], {'$gte': 5, '$lte': 7})
+        self.assertEqual(query['weightBucket'], {'$gte': 19, '$lte': 22})
+
+        tight, wide = results
+        self.assertEqual(tight['count'], 3)
+        self.assertAlmostEqual(tight['averageRate'], statistics.mean([1000, 1000, 1200]))
+        self.assertAlmostEqual(tight['stdDev'], statistics.pstdev([1000, 1000, 1200]))
+        self.assertEqual(wide['count'], 4)
+        self.assertAlmostEqual(wide['averageRate'], 1200.0)
+        self.assertAlmostEqual(wide['stdDev'], statistics.pstdev([1000, 1000, 1200, 1600]))
+
+    def test_empty_ring_is_none(self):
+        results, _ = self.fetch([bucket(7, 22, [1600])], 310, 20500, [(10, 500), (60, 1500)])
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1]['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
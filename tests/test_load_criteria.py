@@ -0,0 +1,61 @@
+import unittest
+from app.bot.load_criteria import LoadCriteria, parse_load_message, extraction_function
+
+
+class TestLoadCriteria(unittest.TestCase):
+
+    def test_regex_pass_fills_recognized_fields(self):
+        criteria = parse_load_message("From Dallas, TX to Houston, TX 240 miles 42,000 lbs reefer hazmat")
+        self.assertEqual(criteria, LoadCriteria(
+            shipper_city='dallas, tx',
+            consignee_city='houston, tx',
+            bill_distance=240,
+            weight=42000,
+            equipment_type='R',
+            hazmat_routing='Yes'
+        ))
+        self.assertEqual(criteria.missing(), [])
+        self.assertEqual(criteria.unfilled(), ['driver_assistance'])
+
+    def test_follow_up_only_fills_what_is_missing(self):
+        first = parse_load_message("from dallas, tx to houston, tx 240 miles")
+        self.assertEqual(first.missing(), ['weight'])
+        merged = first.merge(parse_load_message("weight: 40000 lbs, 300 miles", first.unfilled()))
+        self.assertEqual(merged.weight, 40000)
+        self.assertEqual(merged.bill_distance, 240)  # Already known, so the follow-up doesn't change it
+        self.assertEqual(merged.missing(), [])
+
+    def test_from_arguments_coerces_and_drops_bad_values(self):
+        criteria = LoadCriteria.from_arguments({
+            'shipper_city': 'Chicago, IL',
+            'consignee_city': None,
+            'bill_distance': '1,200 miles',
+            'weight': True,
+            'equipment_type': 'flatbed',
+            'hazmat_routing': False,
+            'unknown': 'ignored'
+        })
+        self.assertEqual(criteria, LoadCriteria(
+            shipper_city='Chicago, IL', bill_distance=1200, equipment_type='F', hazmat_routing='No'
+        ))
+
+    def test_to_dict_applies_defaults(self):
+        load = LoadCriteria('a, tx', 'b, tx', 100, 1000).to_dict()
+        self.assertEqual(load, {
+            'shipperCity': 'a, tx',
+            'consigneeCity': 'b, tx',
+            'billDistance': 100,
+            'weight': 1000,
+            'equipmentType': 'V',
+            'hazmatRouting': 'No',
+            'driverAssistance': 'No'
+        })
+
+    def test_extraction_function_only_asks_for_given_fields(self):
+        function = extraction_function(['weight', 'hazmat_routing'])
+        self.assertEqual(list(function['parameters']['properties']), ['weight', 'hazmat_routing'])
+        self.assertEqual(function['parameters']['required'], ['weight', 'hazmat_routing'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from app.bot.lookup import parse_lookup_csv, parse_lookup_numbers
+
+
+class TestParseLookupNumbers(unittest.TestCase):
+
+    def test_finds_every_format(self):
+        numbers = parse_lookup_numbers("MC 123456, mc-234567\nDOT: 345678 and DOT456789")
+        self.assertEqual(numbers, [('MC', '123456'), ('MC', '234567'), ('DOT', '345678'), ('DOT', '456789')])
+
+    def test_deduplicates_by_leading_zeros(self):
+        self.assertEqual(parse_lookup_numbers("MC 0123456 MC 123456 DOT 123456"), [('MC', '0123456'), ('DOT', '123456')])
+
+
+class TestParseLookupCsv(unittest.TestCase):
+
+    def test_header_selects_number_columns(self):
+        data = b"Name,USDOT Number,MC Number\nAcme,345678,123456\nBeta,,234567\n"
+        self.assertEqual(parse_lookup_csv(data), [('DOT', '345678'), ('MC', '234567')])
+
+    def test_headerless_rows_are_scanned(self):
+        self.assertEqual(parse_lookup_csv(b"MC,123456\nDOT,345678\n"), [('MC', '123456'), ('DOT', '345678')])
+
+    def test_header_without_number_columns_scans_every_cell(self):
+        data = b"carrier,note\nAcme,MC 123456\nBeta,see DOT 345678\n"
+        self.assertEqual(parse_lookup_csv(data), [('MC', '123456'), ('DOT', '345678')])
+
+    def test_deduplicates_by_leading_zeros(self):
+        data = b"DOT\n00345678\n345678\n"
+        self.assertEqual(parse_lookup_csv(data), [('DOT', '00345678')])
+
+
+if __name__ == '__main__':
+    unittest.main()
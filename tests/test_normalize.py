@@ -0,0 +1,41 @@
+import re
+import unittest
+from bson.decimal128 import Decimal128
+from app.db.normalize import to_number, to_number_expression
+
+
+class TestToNumber(unittest.TestCase):
+
+    def test_numbers(self):
+        self.assertEqual(to_number(1200), 1200.0)
+        self.assertEqual(to_number(1200.5), 1200.5)
+        self.assertEqual(to_number(Decimal128('1450.25')), 1450.25)
+
+    def test_booleans_are_not_numbers(self):
+        self.assertIsNone(to_number(True))
+        self.assertIsNone(to_number(False))
+
+    def test_strings(self):
+        self.assertEqual(to_number('1,200 lbs'), 1200.0)
+        self.assertEqual(to_number('$1,450.50'), 1450.5)
+        self.assertEqual(to_number('-20'), -20.0)
+        self.assertIsNone(to_number('call for rate'))
+        self.assertIsNone(to_number(''))
+
+    def test_missing_and_other_types(self):
+        self.assertIsNone(to_number(None))
+        self.assertIsNone(to_number(['1200']))
+
+
+    def test_server_expression_uses_the_same_pattern(self):
+        string_branch, number_branch = to_number_expression('$Rate')['$switch']['branches']
+        found = string_branch['then']['$let']['vars']['found']['$regexFind']
+        self.assertEqual(found['input'], {'$replaceAll': {'input': '$Rate', 'find': ',', 'replacement': ''}})
+        self.assertTrue(re.fullmatch(found['regex'], '-1450.5'))
+        self.assertEqual(to_number(re.search(found['regex'], '$1450.5').group()), to_number('$1,450.5'))
+        # $isNumber is false for booleans, matching to_number
+        self.assertEqual(number_branch['case'], {'$isNumber': '$Rate'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from app.db.normalize import SHIPPER_CITY_KEY, CONSIGNEE_CITY_KEY, EQUIPMENT_KEY, BILL_DISTANCE_NUM, WEIGHT_NUM
+from app.db.pipelines import build_rate_window_pipeline, facet_ring_results, select_ring
+
+RINGS = [(25, 2000), (50, 3500), (100, 5000)]
+
+
+class TestRateWindowPipeline(unittest.TestCase):
+
+    def test_match_uses_widest_ring(self):
+        pipeline = build_rate_window_pipeline(' Dallas ', 'houston', 'v', 300, 20000, [(50, 2000), (25, 5000)])
+        match = pipeline[0]['$match']
+        self.assertEqual(match[SHIPPER_CITY_KEY], 'DALLAS')
+        self.assertEqual(match[CONSIGNEE_CITY_KEY], 'HOUSTON')
+        self.assertEqual(match[EQUIPMENT_KEY], 'V')
+        self.assertEqual(match[BILL_DISTANCE_NUM], {'$gte': 250, '$lte': 350})
+        self.assertEqual(match[WEIGHT_NUM], {'$gte': 15000, '$lte': 25000})
+        facets = pipeline[-1]['$facet']
+        self.assertEqual(list(facets), ['ring0', 'ring1'])
+        self.assertEqual(facets['ring1'][0]['$match'][BILL_DISTANCE_NUM], {'$gte': 275, '$lte': 325})
+
+
+class TestFacetRingResults(unittest.TestCase):
+
+    def test_unpacks_each_ring(self):
+        documents = [{
+            'ring0': [],
+            'ring1': [{'_id': None, 'averageRate': 950.0, 'count': 4}],
+            'ring2': [{'_id': None, 'averageRate': None, 'count': 0}]
+        }]
+        self.assertEqual(facet_ring_results(documents, RINGS), [None, {'averageRate': 950.0, 'count': 4}, None])
+
+    def test_missing_facets_are_empty(self):
+        self.assertEqual(facet_ring_results([], RINGS), [None, None, None])
+        self.assertEqual(facet_ring_results([{}], RINGS), [None, None, None])
+
+
+class TestSelectRing(unittest.TestCase):
+
+    def test_tightest_ring_with_enough_samples(self):
+        results = [{'averageRate': 900.0, 'count': 2}, {'averageRate': 950.0, 'count': 5}, {'averageRate': 1000.0, 'count': 9}]
+        self.assertEqual(select_ring(results, RINGS, 5), {
+            'averageRate': 950.0, 'count': 5, 'distanceTolerance': 50, 'weightTolerance': 3500
+        })
+
+    def test_falls_back_to_tightest_non_empty_ring(self):
+        results = [None, {'averageRate': 950.0, 'count': 2}, {'averageRate': 1000.0, 'count': 3}]
+        self.assertEqual(select_ring(results, RINGS, 5)['averageRate'], 950.0)
+
+    def test_all_rings_empty(self):
+        self.assertIsNone(select_ring([None, None, None], RINGS, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from app.api import resilience
+from app.api.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_probes_after_reset(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, resilience.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.now = 10
+        breaker.before_call()  # The single half-open probe
+        self.assertEqual(breaker.state, resilience.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, resilience.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, resilience.OPEN)
+        clock.now = 9
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestCall(unittest.IsolatedAsyncioTestCase):
+
+    async def test_retries_until_success(self):
+        attempts = 0
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise ConnectionError('reset')
+            return 'ok'
+
+        breaker = CircuitBreaker('test', failure_threshold=5)
+        retry = RetryPolicy(attempts=3, base_delay=0.001, max_delay=0.001)
+        self.assertEqual(await resilience.call(flaky, breaker, deadline=1, retry=retry), 'ok')
+        self.assertEqual(attempts, 3)
+        self.assertEqual(breaker.failures, 0)
+
+    async def test_default_policy_does_not_retry_other_errors(self):
+        attempts = 0
+
+        async def bad_request():
+            nonlocal attempts
+            attempts += 1
+            raise ValueError('400 bad request')
+
+        breaker = CircuitBreaker('test', failure_threshold=5)
+        with self.assertRaises(ValueError):
+            await resilience.call(bad_request, breaker, deadline=1, retry=RetryPolicy(attempts=3, base_delay=0.001))
+        self.assertEqual(attempts, 1)
+
+    async def test_deadline_bounds_slow_calls(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        breaker = CircuitBreaker('test', failure_threshold=5)
+        with self.assertRaises(asyncio.TimeoutError):
+            await resilience.call(slow, breaker, deadline=0.02, retry=RetryPolicy(attempts=3, base_delay=0.05))
+        self.assertEqual(breaker.failures, 1)
+
+    async def test_hedge_returns_faster_duplicate(self):
+        delays = [1, 0]
+
+        async def request():
+            await asyncio.sleep(delays.pop(0))
+            return 'fast'
+
+        breaker = CircuitBreaker('test')
+        self.assertEqual(await resilience.call(request, breaker, deadline=0.5, hedge_after=0.01), 'fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
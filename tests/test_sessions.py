@@ -0,0 +1,34 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from app.db import sessions
+
+
+class TestLoadSession(unittest.TestCase):
+
+    def load(self, company):
+        collection = MagicMock()
+        collection.find_one.return_value = {
+            '_id': 1,
+            'company': company,
+            'numberType': 'MC',
+            'number': '654321',
+            'member': True,
+            'expiresAt': datetime.utcnow() + timedelta(days=1)
+        }
+        with patch.object(sessions, 'db', {sessions.SESSIONS_COLLECTION: collection}):
+            return sessions._load_session(1)
+
+    def test_reads_summary_documents(self):
+        session = self.load({'legal_name': 'ACME TRUCKING LLC', 'dot_number': '1234567'})
+        self.assertEqual(session['company'].name, 'ACME TRUCKING LLC')
+
+    def test_reads_sessions_saved_with_raw_fmcsa_content(self):
+        session = self.load({'carrier': {'legalName': 'ACME TRUCKING LLC', 'dotNumber': 7654321, 'allowedToOperate': 'Y'}})
+        self.assertEqual(session['company'].name, 'ACME TRUCKING LLC')
+        self.assertEqual(session['company'].allowed_to_operate, 'Y')
+        self.assertEqual(session['company'].mc_number, '654321')
+
+
+if __name__ == '__main__':
+    unittest.main()
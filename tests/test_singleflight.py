@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from app.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight('test')
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        results = await asyncio.gather(*(flights.do('MC:1', work) for _ in range(10)))
+        self.assertEqual(results, ['result'] * 10)
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(flights), 0)
+
+    async def test_exception_reaches_every_waiter(self):
+        flights = SingleFlight('test')
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError('upstream failed')
+
+        results = await asyncio.gather(flights.do('k', work), flights.do('k', work), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_cancelling_one_waiter_keeps_work_for_others(self):
+        flights = SingleFlight('test')
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.02)
+            return 'done'
+
+        first = asyncio.create_task(flights.do('k', work))
+        second = asyncio.create_task(flights.do('k', work))
+        await started.wait()
+        first.cancel()
+        self.assertEqual(await second, 'done')
+
+    async def test_cancelling_last_waiter_cancels_work(self):
+        flights = SingleFlight('test')
+        started = asyncio.Event()
+        finished = False
+
+        async def work():
+            nonlocal finished
+            started.set()
+            await asyncio.sleep(1)
+            finished = True
+
+        waiter = asyncio.create_task(flights.do('k', work))
+        await started.wait()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        self.assertFalse(finished)
+        self.assertEqual(len(flights), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from app.db.watchlist import diff_snapshots
+
+
+def snapshot(**fields):
+    base = {
+        'status': 'verified',
+        'allowed_to_operate': 'Y',
+        'safety_rating': 'S',
+        'legal_name': 'ACME TRUCKING LLC',
+        'operation_type': 'Carrier'
+    }
+    base.update(fields)
+    return base
+
+
+class TestDiffSnapshots(unittest.TestCase):
+
+    def test_unchanged(self):
+        self.assertEqual(diff_snapshots(snapshot(), snapshot()), [])
+
+    def test_status_flip(self):
+        old = snapshot()
+        new = dict.fromkeys(old)
+        new['status'] = 'not_verified'
+        self.assertEqual(diff_snapshots(old, new)[0], ('Verification status', 'verified', 'not_verified'))
+
+    def test_real_changes_are_reported(self):
+        changes = diff_snapshots(snapshot(), snapshot(allowed_to_operate='N', safety_rating='U'))
+        self.assertEqual(changes, [('Allowed to operate', 'Y', 'N'), ('Safety rating', 'S', 'U')])
+
+    def test_unknown_value_filled_in_is_not_a_change(self):
+        old = snapshot(allowed_to_operate=None, safety_rating=None)
+        self.assertEqual(diff_snapshots(old, snapshot()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()